@@ -0,0 +1,151 @@
+"""
+Ride Store Benchmark for GoGuard
+Compares ride registry backends under concurrent ride updates
+
+Usage: python benchmark_ride_store.py [--rides 200] [--ops 20000] [--threads 1 8 32] [--processes 4]
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List
+
+from ride_registry import RideRegistry, SQLiteRideRegistry
+
+
+@dataclass
+class BenchRide:
+    id: str
+    status: str = 'ACTIVE'
+    is_safe_triggered: bool = False
+    transcripts: List[str] = field(default_factory=list)
+    safety_events: List[Dict] = field(default_factory=list)
+
+
+def encode(ride: BenchRide) -> Dict:
+    record = asdict(ride)
+    record.pop('safety_events')
+    return record
+
+
+def decode(record: Dict, safety_events: List[Dict]) -> BenchRide:
+    return BenchRide(**record, safety_events=safety_events)
+
+
+def make_store(backend: str, path: str):
+    if backend == 'memory':
+        return RideRegistry()
+    return SQLiteRideRegistry(path, encode=encode, decode=decode)
+
+
+def one_op(store, ride_ids: List[str], rng: random.Random):
+    """Request mix of a ride in progress: status polls, events, voice updates"""
+    ride_id = rng.choice(ride_ids)
+    roll = rng.random()
+    if roll < 0.5:
+        store.read(ride_id, lambda ride: (ride.status, list(ride.safety_events)), default=None)
+    elif roll < 0.8:
+        store.append_event(ride_id, {"timestamp": time.time(), "type": "ROUTE_DEVIATION"})
+    else:
+        def voice(ride):
+            ride.transcripts.append("everything ok")
+            ride.is_safe_triggered = ride.is_safe_triggered or rng.random() < 0.01
+        store.update(ride_id, voice, default=None)
+
+
+def run_worker(store, ride_ids: List[str], ops: int, seed: int, latencies: List[float]):
+    rng = random.Random(seed)
+    for _ in range(ops):
+        started = time.perf_counter()
+        one_op(store, ride_ids, rng)
+        latencies.append(time.perf_counter() - started)
+
+
+def process_worker(backend: str, path: str, ride_ids: List[str], ops: int, seed: int, queue):
+    latencies: List[float] = []
+    run_worker(make_store(backend, path), ride_ids, ops, seed, latencies)
+    queue.put(latencies)
+
+
+def report(label: str, latencies: List[float], elapsed: float):
+    latencies.sort()
+
+    def ms(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    print(f"{label:<28} {len(latencies) / elapsed:>10,.0f} ops/s   "
+          f"p50 {ms(0.5):7.3f} ms   p99 {ms(0.99):7.3f} ms")
+
+
+def bench_threads(backend: str, path: str, rides: int, ops: int, threads: int):
+    store = make_store(backend, path)
+    ride_ids = [f"RIDE_{i}" for i in range(rides)]
+    for ride_id in ride_ids:
+        store.put(ride_id, BenchRide(ride_id))
+
+    latencies: List[float] = []
+    workers = [
+        threading.Thread(target=run_worker, args=(store, ride_ids, ops // threads, seed, latencies))
+        for seed in range(threads)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    report(f"{backend} x{threads} threads", latencies, time.perf_counter() - started)
+
+    for ride_id in ride_ids:
+        store.pop(ride_id)
+
+
+def bench_processes(path: str, rides: int, ops: int, processes: int):
+    """Only a shared backend can be updated from several processes"""
+    store = make_store('sqlite', path)
+    ride_ids = [f"RIDE_{i}" for i in range(rides)]
+    for ride_id in ride_ids:
+        store.put(ride_id, BenchRide(ride_id))
+
+    queue = multiprocessing.Queue()
+    workers = [
+        multiprocessing.Process(target=process_worker,
+                                args=('sqlite', path, ride_ids, ops // processes, seed, queue))
+        for seed in range(processes)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    latencies: List[float] = []
+    for _ in workers:
+        latencies.extend(queue.get())
+    for worker in workers:
+        worker.join()
+    report(f"sqlite x{processes} processes", latencies, time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--rides', type=int, default=200)
+    parser.add_argument('--ops', type=int, default=20000)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 8, 32])
+    parser.add_argument('--processes', type=int, default=4)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'rides.db')
+        print(f"{args.rides} rides, {args.ops} operations per run "
+              f"(50% status reads, 30% event appends, 20% ride updates)")
+        for backend in ('memory', 'sqlite'):
+            for threads in args.threads:
+                bench_threads(backend, path, args.rides, args.ops, threads)
+        if args.processes > 1:
+            bench_processes(path, args.rides, args.ops, args.processes)
+
+
+if __name__ == '__main__':
+    main()
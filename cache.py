@@ -0,0 +1,307 @@
+"""
+Caching for GoGuard
+Bounded TTL + LRU cache with hit/miss metrics and request coalescing,
+optionally backed by a persistent SQLite cache shared between processes
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Thread-safe cache with a size bound, true TTL expiry and LRU eviction.
+
+    ``get_or_compute`` coalesces concurrent misses for the same key: the first
+    caller computes the value, every other caller waits for that result
+    instead of starting its own upstream request.
+
+    With a ``backend`` (e.g. ``SQLiteCache``) the in-memory cache becomes the
+    first tier: misses are looked up in the backend before computing, and
+    every stored value is written through to it.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, clock: Callable[[], float] = time.monotonic,
+                 backend: Optional['SQLiteCache'] = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = backend
+        self._clock = clock
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()  # key -> (expires_at, value)
+        self._inflight: Dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+        self.backend_hits = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING, count=False) is not _MISSING
+
+    def get(self, key: Hashable, default: Any = None, count: bool = True) -> Any:
+        """Return a fresh cached value or ``default``"""
+        with self._lock:
+            value = self._lookup(key)
+        if value is _MISSING:
+            value = self._load_from_backend(key)
+
+        if count:
+            with self._lock:
+                if value is _MISSING:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+        return default if value is _MISSING else value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        with self._lock:
+            self._store(key, value, ttl)
+        if self.backend is not None:
+            self.backend.set(key, value, self.ttl if ttl is None else ttl)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if self.backend is not None:
+            self.backend.delete(key)
+        return default if entry is None else entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any], ttl: Optional[float] = None,
+                       cache_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """Return the cached value, computing it once on a miss.
+
+        Concurrent callers for the same missing key share one ``compute()``
+        call. ``cache_if`` can reject results that should not be stored (they
+        are still returned to every waiting caller).
+        """
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+
+            self.misses += 1
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = self._load_from_backend(key)
+            if value is not _MISSING:
+                with self._lock:
+                    del self._inflight[key]
+                future.set_result(value)
+                return value
+
+            value = compute()
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        cacheable = cache_if is None or cache_if(value)
+        with self._lock:
+            if cacheable:
+                self._store(key, value, ttl)
+            del self._inflight[key]
+        future.set_result(value)
+
+        if cacheable and self.backend is not None:
+            self.backend.set(key, value, self.ttl if ttl is None else ttl)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+                "backend": self.backend.path if self.backend is not None else None,
+                "backend_hits": self.backend_hits,
+            }
+
+    def _load_from_backend(self, key: Hashable) -> Any:
+        """Promote a value from the persistent tier into memory"""
+        if self.backend is None:
+            return _MISSING
+        try:
+            entry = self.backend.get_entry(key)
+        except sqlite3.Error as e:
+            print(f"Cache backend error: {e}")
+            return _MISSING
+        if entry is None:
+            return _MISSING
+
+        value, remaining_ttl = entry
+        with self._lock:
+            self._store(key, value, remaining_ttl)
+            self.backend_hits += 1
+        return value
+
+    def _lookup(self, key: Hashable) -> Any:
+        # Caller holds the lock
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at <= self._clock():
+            del self._data[key]
+            self.expirations += 1
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    def _store(self, key: Hashable, value: Any, ttl: Optional[float]):
+        # Caller holds the lock
+        expires_at = self._clock() + (self.ttl if ttl is None else ttl)
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+
+class SQLiteCache:
+    """Persistent TTL cache stored in one SQLite file.
+
+    Safe to share between processes on one host (e.g. gunicorn workers): the
+    database runs in WAL mode, so readers never block the writer, and every
+    thread/process gets its own connection. Keys and values must be JSON
+    serializable. Expired rows are removed by ``compact()``, which also runs
+    automatically every ``compact_interval`` seconds of writes.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: Optional[int] = None,
+                 compact_interval: float = 600):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.compact_interval = compact_interval
+        self._local = threading.local()
+        self._last_compact = time.time()
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " namespace TEXT NOT NULL,"
+                " key TEXT NOT NULL,"
+                " value TEXT NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " updated_at REAL NOT NULL,"
+                " PRIMARY KEY (namespace, key))"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_expiry ON cache (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # One connection per thread, reopened after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @staticmethod
+    def _encode_key(key: Hashable) -> str:
+        return json.dumps(key, sort_keys=True, default=str)
+
+    def get_entry(self, key: Hashable) -> Optional[tuple]:
+        """Return (value, remaining_ttl_seconds) or None when missing/expired"""
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT value, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (self.namespace, self._encode_key(key), now)
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1] - now
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self.get_entry(key)
+        return default if entry is None else entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float):
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache (namespace, key, value, expires_at, updated_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, self._encode_key(key), json.dumps(value, default=str), now + ttl, now)
+                )
+        except sqlite3.Error as e:
+            print(f"Cache backend error: {e}")
+            return
+
+        if now - self._last_compact > self.compact_interval:
+            self.compact()
+
+    def delete(self, key: Hashable):
+        with self._connection() as conn:
+            conn.execute(
+                "DELETE FROM cache WHERE namespace = ? AND key = ?",
+                (self.namespace, self._encode_key(key))
+            )
+
+    def compact(self) -> int:
+        """Drop expired rows (and the oldest beyond max_entries); returns rows removed"""
+        self._last_compact = time.time()
+        removed = 0
+        try:
+            with self._connection() as conn:
+                removed += conn.execute(
+                    "DELETE FROM cache WHERE namespace = ? AND expires_at <= ?",
+                    (self.namespace, self._last_compact)
+                ).rowcount
+                if self.max_entries is not None:
+                    removed += conn.execute(
+                        "DELETE FROM cache WHERE namespace = ? AND key NOT IN ("
+                        " SELECT key FROM cache WHERE namespace = ?"
+                        " ORDER BY updated_at DESC LIMIT ?)",
+                        (self.namespace, self.namespace, self.max_entries)
+                    ).rowcount
+            self._connection().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        except sqlite3.Error as e:
+            print(f"Cache compaction error: {e}")
+        return removed
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM cache WHERE namespace = ? AND expires_at > ?",
+            (self.namespace, time.time())
+        ).fetchone()[0]
@@ -0,0 +1,142 @@
+"""
+Driver Matching for GoGuard
+Uniform lat/lng grid over driver positions for nearest-driver lookups
+"""
+
+import math
+import threading
+from typing import Dict, List, Set, Tuple
+import numpy as np
+
+from driver_store import DriverFleet
+
+KM_PER_DEG_LAT = 110.574
+KM_PER_DEG_LNG_EQUATOR = 111.320
+
+
+class DriverGridIndex:
+    """Grid index answering "k nearest active drivers to a point".
+
+    Drivers are bucketed into square cells of ``cell_size_deg`` degrees. A
+    query walks rings of cells outwards from the pickup cell and stops as soon
+    as the k-th best distance found is closer than anything an unvisited ring
+    could contain, so only a handful of cells are scanned even for 100k+
+    drivers. Rows are the same row numbers used by ``DriverFleet``.
+    """
+
+    def __init__(self, size: int, cell_size_deg: float = 0.01):
+        self.cell_size_deg = cell_size_deg
+        self._lat = np.zeros(size, dtype=np.float64)
+        self._lng = np.zeros(size, dtype=np.float64)
+        self._cells: Dict[Tuple[int, int], Set[int]] = {}
+        self._cell_of: Dict[int, Tuple[int, int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_fleet(cls, fleet: DriverFleet, cell_size_deg: float = 0.01) -> 'DriverGridIndex':
+        """Index every active driver of the fleet at its last known location"""
+        index = cls(len(fleet), cell_size_deg)
+        index._lat[:] = fleet.column('lat')
+        index._lng[:] = fleet.column('lng')
+
+        active = np.flatnonzero(fleet.column('status') == 'active')
+        cell_i = np.floor(index._lat[active] / cell_size_deg).astype(np.int64)
+        cell_j = np.floor(index._lng[active] / cell_size_deg).astype(np.int64)
+        for row, i, j in zip(active.tolist(), cell_i.tolist(), cell_j.tolist()):
+            index._cells.setdefault((i, j), set()).add(row)
+            index._cell_of[row] = (i, j)
+
+        return index
+
+    def __len__(self) -> int:
+        return len(self._cell_of)
+
+    def _cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return (math.floor(lat / self.cell_size_deg), math.floor(lng / self.cell_size_deg))
+
+    def update_position(self, row: int, lat: float, lng: float):
+        """Move a driver to a new position (only touches the two affected cells)"""
+        with self._lock:
+            self._lat[row] = lat
+            self._lng[row] = lng
+            if row not in self._cell_of:
+                return
+            new_cell = self._cell(lat, lng)
+            old_cell = self._cell_of[row]
+            if new_cell != old_cell:
+                self._remove_from_cell(row, old_cell)
+                self._cells.setdefault(new_cell, set()).add(row)
+                self._cell_of[row] = new_cell
+
+    def set_active(self, row: int, active: bool):
+        """Add or remove a driver from matching (e.g. on status change)"""
+        with self._lock:
+            if active and row not in self._cell_of:
+                cell = self._cell(self._lat[row], self._lng[row])
+                self._cells.setdefault(cell, set()).add(row)
+                self._cell_of[row] = cell
+            elif not active and row in self._cell_of:
+                self._remove_from_cell(row, self._cell_of.pop(row))
+
+    def _remove_from_cell(self, row: int, cell: Tuple[int, int]):
+        members = self._cells[cell]
+        members.discard(row)
+        if not members:
+            del self._cells[cell]
+
+    def nearest(self, lat: float, lng: float, k: int = 5) -> List[Tuple[int, float]]:
+        """Return up to k (row, distance_km) pairs, closest first"""
+        km_per_deg_lng = KM_PER_DEG_LNG_EQUATOR * math.cos(math.radians(lat))
+        ring_km = self.cell_size_deg * min(KM_PER_DEG_LAT, km_per_deg_lng)
+        center_i, center_j = self._cell(lat, lng)
+
+        with self._lock:
+            total = len(self._cell_of)
+            if total == 0 or k <= 0:
+                return []
+
+            rows: List[int] = []
+            ring = 0
+            while True:
+                if 8 * ring > len(self._cells):
+                    # Sparse fleet far from the query: a scan of the occupied
+                    # cells is cheaper than walking empty rings
+                    rows = list(self._cell_of)
+                    break
+                for cell in self._ring_cells(center_i, center_j, ring):
+                    members = self._cells.get(cell)
+                    if members:
+                        rows.extend(members)
+
+                if len(rows) >= total:
+                    break
+                if len(rows) >= k:
+                    # Anything outside the visited square is at least
+                    # ring * cell size away from the query point
+                    distances = self._distances(rows, lat, lng, km_per_deg_lng)
+                    if np.partition(distances, k - 1)[k - 1] <= ring * ring_km:
+                        break
+                ring += 1
+
+            candidates = np.array(rows, dtype=np.int64)
+            distances = self._distances(candidates, lat, lng, km_per_deg_lng)
+
+        order = np.argsort(distances)[:k]
+        return [(int(candidates[i]), float(distances[i])) for i in order]
+
+    def _distances(self, rows, lat: float, lng: float, km_per_deg_lng: float) -> np.ndarray:
+        """Equirectangular distance in km, accurate enough at city scale"""
+        dy = (self._lat[rows] - lat) * KM_PER_DEG_LAT
+        dx = (self._lng[rows] - lng) * km_per_deg_lng
+        return np.sqrt(dx * dx + dy * dy)
+
+    def _ring_cells(self, center_i: int, center_j: int, ring: int):
+        if ring == 0:
+            yield (center_i, center_j)
+            return
+        for j in range(center_j - ring, center_j + ring + 1):
+            yield (center_i - ring, j)
+            yield (center_i + ring, j)
+        for i in range(center_i - ring + 1, center_i + ring):
+            yield (i, center_j - ring)
+            yield (i, center_j + ring)
@@ -0,0 +1,371 @@
+"""
+Driver Fleet Store for GoGuard
+Compact columnar driver storage with Driver-compatible row views
+"""
+
+from dataclasses import dataclass
+import sys
+from typing import Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+import pandas as pd
+
+
+@dataclass
+class Driver:
+    """Driver data class to match your existing structure"""
+    id: str
+    name: str
+    photo: str
+    rating: float
+    total_rides: int
+    acceptance_rate: float
+    vehicle_number: str
+    vehicle_model: str
+    phone: str = ""
+    join_date: str = ""
+    status: str = "active"
+    vehicle_type: str = ""
+    vehicle_year: int = 2020
+    last_location: Tuple[float, float] = (0.0, 0.0)
+    total_earnings: int = 0
+    avg_trip_duration: float = 0.0
+    cancellation_rate: float = 0.0
+    languages: str = ""
+    vehicle_color: str = ""
+
+    @property
+    def safety_score(self) -> float:
+        """Calculate safety score based on driver metrics"""
+        return float(compute_safety_scores(self.rating, self.total_rides,
+                                           self.acceptance_rate, self.cancellation_rate))
+
+
+def compute_safety_scores(rating, total_rides, acceptance_rate, cancellation_rate):
+    """Driver safety score from metrics, for scalars or whole NumPy columns"""
+    # Base score from rating (normalized to 0-1)
+    rating_score = (np.asarray(rating, dtype=np.float64) - 1) / 4  # Convert 1-5 rating to 0-1
+
+    # Experience factor (more rides = higher safety)
+    experience_factor = np.minimum(1.0, np.asarray(total_rides, dtype=np.float64) / 2000)
+
+    # Acceptance rate factor
+    acceptance_factor = np.asarray(acceptance_rate, dtype=np.float64)
+
+    # Low cancellation rate is good
+    cancellation_factor = 1 - np.asarray(cancellation_rate, dtype=np.float64)
+
+    # Weighted average
+    safety_score = (rating_score * 0.4 +
+                   experience_factor * 0.3 +
+                   acceptance_factor * 0.2 +
+                   cancellation_factor * 0.1)
+
+    return np.clip(safety_score, 0.0, 1.0)
+
+
+# How each field is stored:
+#   'category' - interned: small integer codes plus one array of distinct values
+#   'packed'   - mostly-unique text as fixed-width UTF-8 bytes (no str objects)
+#   NumPy dtype - plain numeric column; float32 columns are read back rounded
+#                 to FLOAT32_DECIMALS, which covers the precision of the CSV
+CATEGORY = 'category'
+PACKED = 'packed'
+FLOAT32_DECIMALS = 6
+
+# CSV column -> (column name in the store, storage, default when the column is missing)
+# Every column is parsed in one read_csv pass, so no per-cell float()/int()
+# conversion happens in Python.
+DRIVER_CSV_COLUMNS = {
+    'driver_id': ('id', PACKED, None),
+    'name': ('name', PACKED, None),
+    'photo': ('photo', PACKED, None),
+    'rating': ('rating', np.float32, None),
+    'total_trips': ('total_rides', np.int32, None),
+    'acceptance_rate': ('acceptance_rate', np.float32, None),
+    'license_plate': ('vehicle_number', PACKED, None),
+    'vehicle_model': ('vehicle_model', CATEGORY, None),
+    'phone': ('phone', PACKED, ''),
+    'join_date': ('join_date', CATEGORY, ''),
+    'status': ('status', CATEGORY, 'active'),
+    'vehicle_type': ('vehicle_type', CATEGORY, ''),
+    'vehicle_year': ('vehicle_year', np.int16, 2020),
+    'last_location_lat': ('lat', np.float64, 0.0),
+    'last_location_lng': ('lng', np.float64, 0.0),
+    'total_earnings': ('total_earnings', np.int64, 0),
+    'avg_trip_duration': ('avg_trip_duration', np.float32, 0.0),
+    'cancellation_rate': ('cancellation_rate', np.float32, 0.0),
+    'languages': ('languages', CATEGORY, ''),
+    'vehicle_color': ('vehicle_color', CATEGORY, ''),
+}
+
+STORAGE = {name: storage for name, storage, _ in DRIVER_CSV_COLUMNS.values()}
+
+# Columns the safety score is derived from
+SCORE_METRICS = ('rating', 'total_rides', 'acceptance_rate', 'cancellation_rate')
+
+
+def _pack(values) -> np.ndarray:
+    """Encode strings as one fixed-width UTF-8 byte array"""
+    encoded = pd.Series(values, dtype=object).str.encode('utf-8')
+    return np.array(encoded.to_numpy(), dtype='S')
+
+
+def _categorize(values) -> Tuple[np.ndarray, np.ndarray]:
+    """Split strings into (codes, categories) like pandas.Categorical"""
+    categorical = pd.Categorical(values)
+    codes = np.array(categorical.codes, copy=True)
+    return codes, np.asarray(categorical.categories, dtype=object)
+
+
+class DriverView:
+    """Read-only, Driver-compatible view of one fleet row.
+
+    Holds only the fleet and a row number, so handing out views costs a few
+    dozen bytes instead of a full Driver. Use ``to_driver()`` when a detached
+    snapshot is needed (e.g. to store on a Ride or pass to ``asdict``).
+    """
+
+    __slots__ = ('_fleet', 'row')
+
+    def __init__(self, fleet: 'DriverFleet', row: int):
+        self._fleet = fleet
+        self.row = row
+
+    def __getattr__(self, name: str):
+        if name in STORAGE:
+            return self._fleet.value(self.row, name)
+        raise AttributeError(f"'DriverView' object has no attribute '{name}'")
+
+    @property
+    def last_location(self) -> Tuple[float, float]:
+        return self._fleet.value(self.row, 'lat'), self._fleet.value(self.row, 'lng')
+
+    @property
+    def safety_score(self) -> float:
+        """Precomputed fleet score, no recomputation"""
+        return self._fleet.safety_score(self.row)
+
+    def to_driver(self) -> Driver:
+        return self._fleet.materialize(self.row)
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, DriverView):
+            return self._fleet is other._fleet and self.row == other.row
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        return hash((id(self._fleet), self.row))
+
+    def __repr__(self) -> str:
+        return f"DriverView(id={self.id!r}, name={self.name!r}, row={self.row})"
+
+
+class DriverFleet:
+    """Struct-of-arrays store of the whole driver fleet.
+
+    Each Driver field lives in one NumPy array (``last_location`` is split into
+    ``lat``/``lng``). Repeated text such as status or vehicle model is interned
+    as integer codes, and unique text such as ids and names is packed as UTF-8
+    bytes, so the fleet holds no per-driver Python objects at all. The fleet
+    behaves like a read-only sequence of ``DriverView`` rows, so
+    ``random.choice(fleet)`` and ``fleet[i]`` keep working. Safety scores for
+    the whole fleet are computed once as a vector and kept in sync by
+    ``update_metrics``.
+    """
+
+    def __init__(self, columns: Dict[str, np.ndarray], categories: Dict[str, np.ndarray]):
+        self._columns = columns
+        self._categories = categories
+        self._size = len(columns['id'])
+        self._id_order = None
+        self._safety_scores = compute_safety_scores(
+            columns['rating'], columns['total_rides'],
+            columns['acceptance_rate'], columns['cancellation_rate'])
+
+    @classmethod
+    def from_csv(cls, file_path: str) -> 'DriverFleet':
+        """Parse the driver CSV in one columnar pass with explicit dtypes"""
+        csv_dtypes = {}
+        for csv_name, (_, storage, default) in DRIVER_CSV_COLUMNS.items():
+            if storage == CATEGORY:
+                csv_dtypes[csv_name] = 'category'
+            elif storage == PACKED:
+                csv_dtypes[csv_name] = str
+            else:
+                # Numeric columns with a default may contain blanks; read them
+                # as float first and fill below
+                csv_dtypes[csv_name] = np.float64
+
+        df = pd.read_csv(
+            file_path,
+            usecols=lambda column: column in DRIVER_CSV_COLUMNS,
+            dtype=csv_dtypes,
+        )
+
+        values = {}
+        for csv_name, (name, _, default) in DRIVER_CSV_COLUMNS.items():
+            if csv_name not in df.columns:
+                if default is None:
+                    raise KeyError(f"Missing required column '{csv_name}'")
+                values[name] = [default] * len(df)
+                continue
+
+            series = df[csv_name]
+            if default is not None and series.hasnans:
+                if isinstance(series.dtype, pd.CategoricalDtype) and default not in series.cat.categories:
+                    series = series.cat.add_categories([default])
+                series = series.fillna(default)
+            values[name] = series
+
+        return cls._from_values(values)
+
+    @classmethod
+    def from_records(cls, drivers: Iterable[Driver]) -> 'DriverFleet':
+        """Build a fleet from already constructed Driver objects"""
+        drivers = list(drivers)
+        values = {}
+        for name in STORAGE:
+            if name == 'lat':
+                values[name] = [d.last_location[0] for d in drivers]
+            elif name == 'lng':
+                values[name] = [d.last_location[1] for d in drivers]
+            else:
+                values[name] = [getattr(d, name) for d in drivers]
+
+        return cls._from_values(values)
+
+    @classmethod
+    def _from_values(cls, values: Dict) -> 'DriverFleet':
+        columns, categories = {}, {}
+        for name, storage in STORAGE.items():
+            column = values[name]
+            if storage == CATEGORY:
+                columns[name], categories[name] = _categorize(column)
+            elif storage == PACKED:
+                columns[name] = _pack(column)
+            else:
+                columns[name] = np.array(column, dtype=storage)
+
+        return cls(columns, categories)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, index: int) -> DriverView:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("driver index out of range")
+        return DriverView(self, index)
+
+    def __iter__(self) -> Iterator[DriverView]:
+        for index in range(self._size):
+            yield DriverView(self, index)
+
+    def value(self, row: int, name: str):
+        """Single field of one driver as a plain Python value"""
+        storage = STORAGE[name]
+        if storage == CATEGORY:
+            return self._categories[name][self._columns[name][row]]
+        if storage == PACKED:
+            return self._columns[name][row].decode('utf-8')
+        if storage == np.float32:
+            return round(self._columns[name][row].item(), FLOAT32_DECIMALS)
+        return self._columns[name][row].item()
+
+    def column(self, name: str) -> np.ndarray:
+        """Whole field as an array; interned and packed text is decoded"""
+        storage = STORAGE[name]
+        if storage == CATEGORY:
+            return self._categories[name][self._columns[name]]
+        if storage == PACKED:
+            return np.char.decode(self._columns[name], 'utf-8').astype(object)
+        return self._columns[name]
+
+    def index_of(self, driver_id: str) -> int:
+        """Row number of a driver id, raises KeyError when unknown"""
+        ids = self._columns['id']
+        if self._id_order is None:
+            self._id_order = np.argsort(ids, kind='stable')
+        key = driver_id.encode('utf-8')
+        pos = np.searchsorted(ids, key, sorter=self._id_order)
+        if pos < self._size and ids[self._id_order[pos]] == key:
+            return int(self._id_order[pos])
+        raise KeyError(driver_id)
+
+    def get(self, driver_id: str) -> DriverView:
+        """Look up a single driver by id"""
+        return DriverView(self, self.index_of(driver_id))
+
+    @property
+    def safety_scores(self) -> np.ndarray:
+        """Precomputed safety score of every driver, indexed by row"""
+        return self._safety_scores
+
+    def safety_score(self, row: int) -> float:
+        return self._safety_scores[row].item()
+
+    def safety_score_of(self, driver_id: str) -> float:
+        return self.safety_score(self.index_of(driver_id))
+
+    def score_rows(self, rows) -> np.ndarray:
+        """Safety scores for many rows at once"""
+        return self._safety_scores[np.asarray(rows, dtype=np.int64)]
+
+    def rank_by_safety(self, rows) -> np.ndarray:
+        """Rows ordered from safest to least safe (stable for equal scores)"""
+        rows = np.asarray(rows, dtype=np.int64)
+        order = np.argsort(-self._safety_scores[rows], kind='stable')
+        return rows[order]
+
+    def update_metrics(self, row: int, **metrics):
+        """Change rating/total_rides/acceptance_rate/cancellation_rate of one
+        driver and refresh only that driver's safety score"""
+        for name, value in metrics.items():
+            if name not in SCORE_METRICS:
+                raise ValueError(f"'{name}' is not a safety score metric")
+            self._columns[name][row] = value
+
+        c = self._columns
+        self._safety_scores[row] = compute_safety_scores(
+            c['rating'][row], c['total_rides'][row],
+            c['acceptance_rate'][row], c['cancellation_rate'][row])
+
+    def update_location(self, row: int, lat: float, lng: float):
+        """Record a new last known position for one driver"""
+        self._columns['lat'][row] = lat
+        self._columns['lng'][row] = lng
+
+    def update_status(self, row: int, status: str):
+        """Change a driver's status (active, offline, ...)"""
+        categories = self._categories['status']
+        matches = np.flatnonzero(categories == status)
+        if len(matches):
+            code = matches[0]
+        else:
+            code = len(categories)
+            self._categories['status'] = np.append(categories, np.array([status], dtype=object))
+            codes = self._columns['status']
+            if code > np.iinfo(codes.dtype).max:
+                self._columns['status'] = codes.astype(np.int32)
+        self._columns['status'][row] = code
+
+    def materialize(self, row: int) -> Driver:
+        """Build a standalone Driver snapshot of one row"""
+        fields = {name: self.value(row, name) for name in STORAGE if name not in ('lat', 'lng')}
+        return Driver(last_location=(self.value(row, 'lat'), self.value(row, 'lng')), **fields)
+
+    def to_list(self) -> List[Driver]:
+        """Materialize every driver (only for small fleets / debugging)"""
+        return [self.materialize(row) for row in range(self._size)]
+
+    def memory_usage(self) -> int:
+        """Approximate bytes held by the store, including interned strings"""
+        total = self._safety_scores.nbytes
+        for column in self._columns.values():
+            total += column.nbytes
+        for categories in self._categories.values():
+            total += categories.nbytes + sum(sys.getsizeof(value) for value in categories)
+        if self._id_order is not None:
+            total += self._id_order.nbytes
+        return total
@@ -0,0 +1,134 @@
+"""
+Event Bus for GoGuard
+In-process publish/subscribe fan-out of ride updates to streaming clients
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Set, Tuple
+
+# Queued in place of a subscriber's backlog once it falls too far behind
+OVERFLOW = {"type": "overflow"}
+
+
+class Subscription:
+    """One listener's queue of events for a topic.
+
+    A subscriber that falls more than ``max_queued`` events behind loses its
+    backlog and gets a single OVERFLOW event instead, telling it to resync
+    from current state rather than holding memory for a stalled client.
+    """
+
+    def __init__(self, bus: 'EventBus', topic: str, max_queued: int):
+        self.topic = topic
+        self._bus = bus
+        self._max_queued = max_queued
+        self._events = deque()
+        self._cond = threading.Condition()
+        self.ended = False
+
+    def _push(self, event: Dict) -> bool:
+        with self._cond:
+            if len(self._events) >= self._max_queued:
+                self._events.clear()
+                self._events.append(OVERFLOW)
+                self._cond.notify_all()
+                return False
+            self._events.append(event)
+            self._cond.notify_all()
+            return True
+
+    def _end(self):
+        with self._cond:
+            self.ended = True
+            self._cond.notify_all()
+
+    def get(self, timeout: float) -> Tuple[List[Dict], bool]:
+        """Queued events, waiting up to ``timeout`` for one.
+
+        Returns (events, ended); once ended is True the topic was closed and
+        no more events follow.
+        """
+        with self._cond:
+            if not self._events and not self.ended:
+                self._cond.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            return events, self.ended
+
+    def close(self):
+        self._bus._unsubscribe(self)
+
+    def __enter__(self) -> 'Subscription':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class EventBus:
+    """Topic -> subscribers fan-out; publishing to a topic nobody follows is a dict miss.
+
+    Events are delivered to subscribers in the process that published them;
+    each subscriber has its own queue, so one slow stream never blocks the
+    publisher or other streams.
+    """
+
+    def __init__(self, max_queued: int = 256):
+        self.max_queued = max_queued
+        self._topics: Dict[str, Set[Subscription]] = {}
+        self._lock = threading.Lock()
+
+        self.published = 0
+        self.delivered = 0
+        self.overflows = 0
+
+    def subscribe(self, topic: str) -> Subscription:
+        subscription = Subscription(self, topic, self.max_queued)
+        with self._lock:
+            self._topics.setdefault(topic, set()).add(subscription)
+        return subscription
+
+    def _unsubscribe(self, subscription: Subscription):
+        with self._lock:
+            subscribers = self._topics.get(subscription.topic)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._topics[subscription.topic]
+
+    def has_subscribers(self, topic: str) -> bool:
+        return topic in self._topics
+
+    def topics(self) -> List[str]:
+        """Topics with at least one subscriber"""
+        with self._lock:
+            return list(self._topics)
+
+    def publish(self, topic: str, event: Dict) -> int:
+        """Queue ``event`` for every subscriber of ``topic``; returns how many got it"""
+        with self._lock:
+            subscribers = list(self._topics.get(topic, ()))
+            self.published += 1
+        delivered = sum(1 for subscription in subscribers if subscription._push(event))
+        with self._lock:
+            self.delivered += delivered
+            self.overflows += len(subscribers) - delivered
+        return delivered
+
+    def close_topic(self, topic: str):
+        """End every subscription to ``topic`` (e.g. when a ride ends)"""
+        with self._lock:
+            subscribers = self._topics.pop(topic, set())
+        for subscription in subscribers:
+            subscription._end()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "topics": len(self._topics),
+                "subscribers": sum(len(subscribers) for subscribers in self._topics.values()),
+                "published": self.published,
+                "delivered": self.delivered,
+                "overflows": self.overflows,
+            }
@@ -3,14 +3,10 @@ GoGuard - AI Guardian Angel for Safe Rides
 Enhanced Hackathon Mockup with Voice Support and Gojek-like UI
 """
 
-from flask import Flask, render_template, request, jsonify, session, send_file
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.styles import getSampleStyleSheet
+from flask import Flask, Response, make_response, render_template, request, jsonify, session, send_file
 import json
 import random
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 import threading
 import time
 from dataclasses import dataclass, asdict
@@ -23,74 +19,47 @@ import hashlib
 import time
 import requests
 import io
+from concurrent.futures import ThreadPoolExecutor, wait
+from driver_store import Driver, DriverFleet, DriverView
+from driver_matching import DriverGridIndex
+from cache import SQLiteCache, TTLCache
+from keyword_matcher import classify_distress, keyword_classifier
+import copy
+from jobs import FAILED, Job, JobQueue
+from scheduler import TimerHandle, TimerWheel
+from ride_registry import ReportStore, RideRegistry, SQLiteReportStore, SQLiteRideRegistry
+from ids import id_generator, new_id
+from event_bus import OVERFLOW, EventBus, Subscription
+from report_pdf import PDFCache
+from report_export import ReportExporter, select_ride_ids
 
 # Import Qwen AI integration
 try:
-    from qwen_inference import QwenSafetyAI
+    from qwen_inference import QwenSafetyAI, VoiceDistressBatcher
     ai_assistant = QwenSafetyAI()
+    voice_batcher = VoiceDistressBatcher(ai_assistant)
 except Exception as e:
     print(f"Qwen AI module not found. Using fallback AI simulation: {e}")
     ai_assistant = None
+    voice_batcher = None
 
-# Import SerpAPI
-try:
-    from serpapi import GoogleSearch
-    SERPAPI_KEY = "99bc69e7729d9076fb8b863ba4f99df50286f1816be181bd578f646905aa1cba"
-except:
-    print("SerpAPI not installed. Using requests fallback.")
-    SERPAPI_KEY = "99bc69e7729d9076fb8b863ba4f99df50286f1816be181bd578f646905aa1cba"
+# SerpAPI is called over plain HTTP so every query can carry a timeout.
+# SERPAPI_ENDPOINT can point at a local stub server for testing.
+SERPAPI_KEY = "99bc69e7729d9076fb8b863ba4f99df50286f1816be181bd578f646905aa1cba"
+SERPAPI_ENDPOINT = os.environ.get('SERPAPI_ENDPOINT', 'https://serpapi.com/search')
+NEWS_QUERY_TIMEOUT = float(os.environ.get('GOGUARD_NEWS_QUERY_TIMEOUT', 4.0))  # seconds per query
+NEWS_SEARCH_DEADLINE = float(os.environ.get('GOGUARD_NEWS_DEADLINE', 5.0))  # seconds for all queries
+
+# Shared pool for the concurrent SerpAPI fan-out. Per-area searches get their
+# own pool because they block on the query pool.
+news_executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='news-search')
+area_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='news-area')
 
 
 app = Flask(__name__)
 app.secret_key = 'goguard-secret-key-hackathon-2024'
 
 # Mock Data Classes
-@dataclass
-class Driver:
-    """Driver data class to match your existing structure"""
-    id: str
-    name: str
-    photo: str
-    rating: float
-    total_rides: int
-    acceptance_rate: float
-    vehicle_number: str
-    vehicle_model: str
-    phone: str = ""
-    join_date: str = ""
-    status: str = "active"
-    vehicle_type: str = ""
-    vehicle_year: int = 2020
-    last_location: Tuple[float, float] = (0.0, 0.0)
-    total_earnings: int = 0
-    avg_trip_duration: float = 0.0
-    cancellation_rate: float = 0.0
-    languages: str = ""
-    vehicle_color: str = ""
-    
-    @property
-    def safety_score(self) -> float:
-        """Calculate safety score based on driver metrics"""
-        # Base score from rating (normalized to 0-1)
-        rating_score = (self.rating - 1) / 4  # Convert 1-5 rating to 0-1
-        
-        # Experience factor (more rides = higher safety)
-        experience_factor = min(1.0, self.total_rides / 2000)
-        
-        # Acceptance rate factor
-        acceptance_factor = self.acceptance_rate
-        
-        # Low cancellation rate is good
-        cancellation_factor = 1 - self.cancellation_rate
-        
-        # Weighted average
-        safety_score = (rating_score * 0.4 + 
-                       experience_factor * 0.3 + 
-                       acceptance_factor * 0.2 + 
-                       cancellation_factor * 0.1)
-        
-        return min(1.0, max(0.0, safety_score))
-
 @dataclass
 class Ride:
     id: str
@@ -108,11 +77,22 @@ class Ride:
     transcripts: List[str] = None
 
 # Mock Database
-MOCK_DRIVERS = [
+MOCK_DRIVERS = DriverFleet.from_records([
     Driver("D001", "Yadi Riyadi", "driver1.jpg", 5.0, 1523, 0.92, "D5323ACF", "Honda Vario"),
     Driver("D002", "Budi Santoso", "driver2.jpg", 4.5, 892, 0.85, "B5678DEF", "Yamaha NMAX"),
     Driver("D003", "Ahmad Prakoso", "driver3.jpg", 4.2, 234, 0.75, "B9012GHI", "Honda Beat"),
-]
+])
+
+# Spatial index over MOCK_DRIVERS positions for nearest-driver matching
+driver_index = DriverGridIndex.from_fleet(MOCK_DRIVERS)
+MATCH_CANDIDATES = 5  # Nearest drivers considered per pickup
+# Held from picking a driver until it is marked busy, so concurrent
+# pickups never get the same driver
+driver_status_lock = threading.Lock()
+# driver id -> rides in progress; more than one only when matching had to
+# fall back to a driver who was already busy
+driver_rides: Dict[str, int] = {}
+DRIVER_STATUSES = ('active', 'busy', 'offline')  # Only 'active' drivers are matched
 
 MOCK_LOCATIONS = {
     "home": {"name": "Jalan Jeruk Sitrun", "coords": (-6.2088, 106.8456), "safety_score": 0.9},
@@ -122,50 +102,95 @@ MOCK_LOCATIONS = {
     "restaurant": {"name": "Sate Khas Senayan", "coords": (-6.2275, 106.8007), "safety_score": 0.87},
 }
 
-# In-memory storage for active rides
-active_rides: Dict[str, Ride] = {}
-ride_reports = {}
+def ride_to_record(ride: Ride) -> Dict:
+    """JSON-ready ride fields; safety events are stored separately"""
+    record = asdict(ride)
+    record.pop('safety_events')
+    record['start_time'] = ride.start_time.isoformat() if ride.start_time else None
+    return record
+
+def ride_from_record(record: Dict, safety_events: List[Dict]) -> Ride:
+    return Ride(**{
+        **record,
+        "driver": Driver(**{**record['driver'], "last_location": tuple(record['driver']['last_location'])}),
+        "pickup_coords": tuple(record['pickup_coords']),
+        "dropoff_coords": tuple(record['dropoff_coords']),
+        "start_time": datetime.fromisoformat(record['start_time']) if record['start_time'] else None,
+        "safety_events": safety_events,
+    })
 
-def load_drivers_from_csv(file_path: str = 'drivers.csv') -> List[Driver]:
-    """Load drivers from CSV file and return list of Driver objects"""
+# Ride state lives in process memory (sharded, with a lock per ride) unless
+# GOGUARD_RIDE_DB names a SQLite file shared by every worker process
+# (e.g. GOGUARD_RIDE_DB=goguard_rides.db)
+RIDE_DB_PATH = os.environ.get('GOGUARD_RIDE_DB')
+if RIDE_DB_PATH:
+    active_rides = SQLiteRideRegistry(RIDE_DB_PATH, encode=ride_to_record, decode=ride_from_record)
+    ride_reports = SQLiteReportStore(RIDE_DB_PATH)
+    if not id_generator.configured:
+        # Ids from processes sharing the store are only disjoint with distinct node ids
+        print(f"Warning: GOGUARD_RIDE_DB is set but GOGUARD_NODE_ID is not; using derived node id "
+              f"{id_generator.node_id}, which may collide with another process. Give each process its own GOGUARD_NODE_ID.")
+else:
+    active_rides = RideRegistry(shards=int(os.environ.get('GOGUARD_RIDE_SHARDS', 64)))
+    ride_reports = ReportStore()
+
+# Report PDFs are rendered once per report content: in memory, or in
+# GOGUARD_PDF_CACHE_DIR, shared by worker processes and served straight from
+# disk; either way bounded by GOGUARD_PDF_CACHE_MB
+pdf_cache = PDFCache(
+    max_bytes=int(float(os.environ.get('GOGUARD_PDF_CACHE_MB', 64)) * 1024 * 1024),
+    directory=os.environ.get('GOGUARD_PDF_CACHE_DIR') or None
+)
+
+# Bulk report exports render in their own process pool (started on first export)
+report_exporter = ReportExporter(workers=int(os.environ.get('GOGUARD_EXPORT_WORKERS', os.cpu_count() or 1)))
+
+# Ride fields that never change after start (start time, duration, route),
+# so ride status progress can be computed without loading the ride
+ride_timings = TTLCache(maxsize=16384, ttl=12 * 60 * 60)
+
+# Safety reports are generated by background jobs, keyed by ride id
+REPORT_WORKERS = int(os.environ.get('GOGUARD_REPORT_WORKERS', 4))
+REPORT_MAX_ATTEMPTS = int(os.environ.get('GOGUARD_REPORT_MAX_ATTEMPTS', 3))
+report_jobs = JobQueue(workers=REPORT_WORKERS, max_attempts=REPORT_MAX_ATTEMPTS, name='report')
+# Jobs live in the process that ended the ride; the report store also keeps a
+# pending marker so other workers know the report is coming. A marker not
+# refreshed for this long (its worker died) is ignored.
+REPORT_PENDING_TTL = float(os.environ.get('GOGUARD_REPORT_PENDING_TTL', 600))
+
+# One timer wheel drives the periodic check of every active ride; the checks
+# themselves run on a small pool, so a slow or locked ride store write never
+# holds up the wheel thread and everyone else's timers
+MONITOR_INTERVAL = float(os.environ.get('GOGUARD_MONITOR_INTERVAL', 10))  # seconds between checks
+monitor_executor = ThreadPoolExecutor(max_workers=int(os.environ.get('GOGUARD_MONITOR_WORKERS', 4)),
+                                      thread_name_prefix='ride-monitor')
+ride_scheduler = TimerWheel(tick=0.1, slots=1024, executor=monitor_executor, name='ride-monitor')
+ride_monitors: Dict[str, TimerHandle] = {}
+
+# Ride updates (safety events, progress, status) are pushed to streaming
+# /api/ride-status clients through ride_bus, one topic per ride id
+PROGRESS_INTERVAL = float(os.environ.get('GOGUARD_PROGRESS_INTERVAL', 3))  # seconds between progress pushes
+ride_bus = EventBus(max_queued=256)
+progress_pusher: Optional[TimerHandle] = None
+progress_pusher_lock = threading.Lock()
+progress_sent: Dict[str, float] = {}
+# Held while a progress push runs; a tick that finds it taken is skipped
+progress_push_lock = threading.Lock()
+
+def load_drivers_from_csv(file_path: str = 'drivers.csv') -> DriverFleet:
+    """Load drivers from CSV file into a columnar DriverFleet"""
     try:
-        df = pd.read_csv(file_path)
-        drivers = []
-        
-        for _, row in df.iterrows():
-            driver = Driver(
-                id=row['driver_id'],
-                name=row['name'],
-                photo=row['photo'],
-                rating=float(row['rating']),
-                total_rides=int(row['total_trips']),
-                acceptance_rate=float(row['acceptance_rate']),
-                vehicle_number=row['license_plate'],
-                vehicle_model=row['vehicle_model'],
-                phone=row.get('phone', ''),
-                join_date=row.get('join_date', ''),
-                status=row.get('status', 'active'),
-                vehicle_type=row.get('vehicle_type', ''),
-                vehicle_year=int(row.get('vehicle_year', 2020)),
-                last_location=(float(row.get('last_location_lat', 0)), 
-                              float(row.get('last_location_lng', 0))),
-                total_earnings=int(row.get('total_earnings', 0)),
-                avg_trip_duration=float(row.get('avg_trip_duration', 0)),
-                cancellation_rate=float(row.get('cancellation_rate', 0)),
-                languages=row.get('languages', ''),
-                vehicle_color=row.get('vehicle_color', '')
-            )
-            drivers.append(driver)
+        drivers = DriverFleet.from_csv(file_path)
         
         print(f"✅ Successfully loaded {len(drivers)} drivers from CSV")
         return drivers
         
     except FileNotFoundError:
         print(f"❌ Error: {file_path} not found")
-        return []
+        return DriverFleet.from_records([])
     except Exception as e:
         print(f"❌ Error loading drivers: {e}")
-        return []
+        return DriverFleet.from_records([])
 
 def load_locations_from_csv(file_path: str = 'locations.csv') -> Dict:
     """Load locations from CSV file and return dictionary compatible with your existing code"""
@@ -259,93 +284,293 @@ def load_csv_data():
     """One-line method to load all CSV data and return as tuple"""
     return load_all_data()
 
-news_cache = {}  # Cache news results to avoid excessive API calls
+# Common Jakarta area mappings
+AREA_MAPPINGS = {
+    'Sudirman': ['Sudirman', 'Jalan Sudirman'],
+    'Kemang': ['Kemang', 'Jalan Kemang'],
+    'Senayan': ['Senayan', 'Jalan Senayan'],
+    'Thamrin': ['Thamrin', 'Grand Indonesia'],
+    'Blok M': ['Blok M', 'Pasaraya'],
+    'Serpong': ['Serpong', 'BSD'],
+    'PIK': ['PIK', 'Pantai Indah Kapuk'],
+    'Kelapa Gading': ['Kelapa Gading', 'Gading'],
+    'Pondok Indah': ['Pondok Indah', 'PI'],
+    'Kuningan': ['Kuningan', 'Rasuna Said']
+}
+
+# Optional on-disk cache shared by all worker processes on this host, so
+# restarts and new workers don't start cold (e.g. GOGUARD_CACHE_DB=goguard_cache.db)
+CACHE_DB_PATH = os.environ.get('GOGUARD_CACHE_DB')
+
+# Cache news results per area to avoid excessive API calls (bounded, 24-hour TTL)
+NEWS_CACHE_SIZE = int(os.environ.get('GOGUARD_NEWS_CACHE_SIZE', 512))
+NEWS_CACHE_TTL = 24 * 60 * 60
+news_cache = TTLCache(
+    maxsize=NEWS_CACHE_SIZE,
+    ttl=NEWS_CACHE_TTL,
+    backend=SQLiteCache(CACHE_DB_PATH, 'news') if CACHE_DB_PATH else None
+)
+
+# Cache Qwen risk assessments per (driver, hour bucket, pickup, dropoff) (1-hour TTL)
+RISK_CACHE_SIZE = int(os.environ.get('GOGUARD_RISK_CACHE_SIZE', 2048))
+RISK_CACHE_TTL = float(os.environ.get('GOGUARD_RISK_CACHE_TTL', 60 * 60))
+RISK_HOUR_BUCKET = max(1, int(os.environ.get('GOGUARD_RISK_HOUR_BUCKET', 1)))  # hours per bucket
+risk_cache = TTLCache(
+    maxsize=RISK_CACHE_SIZE,
+    ttl=RISK_CACHE_TTL,
+    backend=SQLiteCache(CACHE_DB_PATH, 'risk') if CACHE_DB_PATH else None
+)
 
 # News Analysis Functions
+def fetch_news_query(query: str) -> List[Dict]:
+    """Run one SerpAPI query and return its top news items"""
+    params = {
+        "q": query,
+        "location": "Jakarta, Indonesia",
+        "hl": "id",
+        "gl": "id",
+        "google_domain": "google.co.id",
+        "api_key": SERPAPI_KEY,
+        "num": 5,  # Limit results per query
+        "tbs": "qdr:w"  # Results from past week
+    }
+    
+    response = requests.get(SERPAPI_ENDPOINT, params=params, timeout=NEWS_QUERY_TIMEOUT)
+    results = response.json()
+    
+    news_items = []
+    if 'organic_results' in results:
+        for result in results['organic_results'][:3]:  # Top 3 per query
+            news_items.append({
+                'title': result.get('title', ''),
+                'snippet': result.get('snippet', ''),
+                'source': result.get('source', 'Unknown'),
+                'link': result.get('link', ''),
+                'date': result.get('date', 'Recent'),
+                'severity': analyze_news_severity(result)
+            })
+    
+    return news_items
+
 def search_safety_news(pickup_area: str, dropoff_area: str) -> List[Dict]:
-    """Search for safety-related news using SerpAPI"""
-    cache_key = f"{pickup_area}_{dropoff_area}_{datetime.now().strftime('%Y%m%d')}"
+    """Search for safety-related news for a trip by merging per-area results"""
+    areas = list(dict.fromkeys([pickup_area, dropoff_area]))
+    
+    # Look up the areas concurrently; each one is cached on its own
+    futures = [area_executor.submit(search_area_news, area) for area in areas[1:]]
+    per_area = [search_area_news(areas[0])] + [future.result() for future in futures]
+    
+    # The same article can show up for both areas
+    seen_links = set()
+    all_results = []
+    for news_items in per_area:
+        for news_item in news_items:
+            key = news_item['link'] or news_item['title']
+            if key in seen_links:
+                continue
+            seen_links.add(key)
+            all_results.append(news_item)
+    
+    return all_results
+
+def search_area_news(area: str) -> List[Dict]:
+    """Search for safety-related news in one area using SerpAPI"""
+    if news_prefetcher.running:
+        # Handlers only read warm data; a cold known area is queued for the
+        # prefetcher instead of being searched on the request path
+        search = news_cache.get(area)
+        if search is not None:
+            return search['results']
+        if news_prefetcher.request(area):
+            return []
+        # Not an area the prefetcher keeps warm: search it on demand below
     
-    # Check cache first (24-hour cache)
-    if cache_key in news_cache:
-        cached_data = news_cache[cache_key]
-        if (datetime.now() - cached_data['timestamp']).seconds < 86400:  # 24 hours
-            return cached_data['results']
     
     try:
-        # Prepare search queries
-        queries = [
-            f"kecelakaan ojol {pickup_area} OR {dropoff_area} Jakarta",
-            f"penculikan ojol {pickup_area} {dropoff_area} Jakarta",
-            f"demo macet bahaya {pickup_area} OR {dropoff_area} malam",
-            f"begal ojol {pickup_area} OR {dropoff_area} malam",
-        ]
-        
-        all_results = []
+        # Concurrent calls for the same area share one in-flight search
+        search = news_cache.get_or_compute(
+            area,
+            lambda: _run_news_search(area),
+            cache_if=lambda search: search['complete']
+        )
+        return search['results']
         
-        for query in queries:
-            params = {
-                "q": query,
-                "location": "Jakarta, Indonesia",
-                "hl": "id",
-                "gl": "id",
-                "google_domain": "google.co.id",
-                "api_key": SERPAPI_KEY,
-                "num": 5,  # Limit results per query
-                "tbs": "qdr:w"  # Results from past week
-            }
+    except Exception as e:
+        print(f"News search error ({area}): {e}")
+        return []
+
+def _run_news_search(area: str) -> Dict:
+    """Run all news queries for one area under one deadline"""
+    # Prepare search queries
+    queries = [
+        f"kecelakaan ojol {area} Jakarta",
+        f"penculikan ojol {area} Jakarta",
+        f"demo macet bahaya {area} malam",
+        f"begal ojol {area} malam",
+    ]
+    
+    # Issue all queries at once; latency is bounded by the slowest query
+    # and NEWS_SEARCH_DEADLINE, not by the sum of all of them
+    futures = [news_executor.submit(fetch_news_query, query) for query in queries]
+    done, not_done = wait(futures, timeout=NEWS_SEARCH_DEADLINE)
+    
+    all_results = []
+    complete = not not_done
+    for query, future in zip(queries, futures):
+        if future not in done:
+            future.cancel()
+            print(f"News query timed out: {query}")
+        elif future.exception() is not None:
+            complete = False
+            print(f"News query error ({query}): {future.exception()}")
+        else:
+            for news_item in future.result():
+                news_item['area'] = area
+                all_results.append(news_item)
+    
+    # Partial results are returned but not cached, so they get retried
+    return {'results': all_results, 'complete': complete}
+
+class NewsPrefetcher:
+    """Background thread that keeps per-area news warm in news_cache.
+
+    Every known area is refreshed every ``interval`` seconds, give or take
+    ``jitter`` (a fraction of the interval) so refreshes do not line up.
+    Failed or partial refreshes keep the previous cache entry and are retried
+    after ``retry_interval`` seconds.
+    """
+    
+    def __init__(self, areas_fn, interval: float = 3600, jitter: float = 0.1,
+                 retry_interval: float = 120):
+        self.areas_fn = areas_fn
+        self.interval = interval
+        self.jitter = jitter
+        self.retry_interval = retry_interval
+        self.last_refreshed: Dict[str, datetime] = {}
+        self.last_error: Dict[str, str] = {}
+        self._next_due: Dict[str, float] = {}  # area -> time.monotonic() deadline
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+    
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def start(self):
+        if self.running:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name='news-prefetcher', daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        self._stopped.set()
+        self._wakeup.set()
+    
+    def request(self, area: str) -> bool:
+        """Ask for a known area to be refreshed ahead of the regular schedule.
+
+        Returns False for areas outside ``areas_fn()``; those are never
+        scheduled, so caller-supplied names can't grow the refresh set.
+        """
+        if area not in self.areas_fn():
+            return False
+        with self._lock:
+            self._next_due[area] = 0.0
+        self._wakeup.set()
+        return True
+    
+    def _run(self):
+        while not self._stopped.is_set():
+            with self._lock:
+                now = time.monotonic()
+                for area in self.areas_fn():
+                    self._next_due.setdefault(area, now)
+                area, due_at = min(self._next_due.items(), key=lambda item: item[1])
             
-            try:
-                # Try using serpapi library if available
-                search = GoogleSearch(params)
-                results = search.get_dict()
-            except:
-                # Fallback to requests
-                response = requests.get('https://serpapi.com/search', params=params)
-                results = response.json()
+            if due_at > now:
+                self._wakeup.wait(timeout=due_at - now)
+                self._wakeup.clear()
+                continue
             
-            if 'organic_results' in results:
-                for result in results['organic_results'][:3]:  # Top 3 per query
-                    news_item = {
-                        'title': result.get('title', ''),
-                        'snippet': result.get('snippet', ''),
-                        'source': result.get('source', 'Unknown'),
-                        'link': result.get('link', ''),
-                        'date': result.get('date', 'Recent'),
-                        'severity': analyze_news_severity(result)
-                    }
-                    all_results.append(news_item)
-        
-        # Cache results
-        news_cache[cache_key] = {
-            'timestamp': datetime.now(),
-            'results': all_results
-        }
+            self._refresh(area)
+    
+    def _refresh(self, area: str):
+        try:
+            search = _run_news_search(area)
+        except Exception as e:
+            search = {'results': [], 'complete': False}
+            self.last_error[area] = str(e)
         
-        return all_results
+        if search['complete']:
+            # Keep entries alive well past the next scheduled refresh
+            news_cache.set(area, search, ttl=max(NEWS_CACHE_TTL, 2 * self.interval))
+            self.last_refreshed[area] = datetime.now()
+            self.last_error.pop(area, None)
+            delay = self.interval * (1 + random.uniform(-self.jitter, self.jitter))
+        else:
+            self.last_error.setdefault(area, 'Incomplete search (timeout or upstream error)')
+            delay = self.retry_interval * (1 + random.uniform(0, self.jitter))
         
-    except Exception as e:
-        print(f"News search error: {e}")
-        return []
+        with self._lock:
+            self._next_due[area] = time.monotonic() + delay
+    
+    def status(self) -> Dict:
+        now = time.monotonic()
+        with self._lock:
+            next_due = dict(self._next_due)
+        return {
+            "running": self.running,
+            "interval_seconds": self.interval,
+            "jitter": self.jitter,
+            "areas": {
+                area: {
+                    "last_refreshed": self.last_refreshed[area].isoformat() if area in self.last_refreshed else None,
+                    "next_refresh_in": round(max(0.0, at - now), 1),
+                    "last_error": self.last_error.get(area)
+                }
+                for area, at in sorted(next_due.items())
+            }
+        }
+
+def known_news_areas() -> List[str]:
+    """Areas from extract_area_name's mapping plus every district in the locations"""
+    areas = list(AREA_MAPPINGS)
+    for location in MOCK_LOCATIONS.values():
+        district = location.get('district')
+        if isinstance(district, str) and district and district not in areas:
+            areas.append(district)
+    return areas
+
+NEWS_REFRESH_INTERVAL = float(os.environ.get('GOGUARD_NEWS_REFRESH_SECONDS', 3600))
+NEWS_REFRESH_JITTER = float(os.environ.get('GOGUARD_NEWS_REFRESH_JITTER', 0.1))
+news_prefetcher = NewsPrefetcher(known_news_areas, NEWS_REFRESH_INTERVAL, NEWS_REFRESH_JITTER)
+NEWS_PREFETCH = os.environ.get('GOGUARD_NEWS_PREFETCH', '1') == '1'
+
+@app.before_request
+def start_news_prefetcher():
+    """Start the prefetcher in whichever process serves requests.
+
+    Started lazily rather than at import so it runs under any WSGI server
+    (one per forked worker) and never in the debug reloader's watcher
+    process, which serves no requests.
+    """
+    if NEWS_PREFETCH and not news_prefetcher.running:
+        news_prefetcher.start()
 
 def analyze_news_severity(news_item: Dict) -> str:
     """Analyze news severity based on content"""
-    title = news_item.get('title', '').lower()
-    snippet = news_item.get('snippet', '').lower()
-    combined_text = title + ' ' + snippet
-    
-    # High severity keywords
-    high_severity = ['penculikan', 'pembunuhan', 'pemerkosaan', 'perampokan', 
-                     'begal', 'tewas', 'meninggal', 'korban jiwa']
+    combined_text = news_item.get('title', '') + ' ' + news_item.get('snippet', '')
     
-    # Medium severity keywords
-    medium_severity = ['kecelakaan', 'tabrakan', 'luka', 'terluka', 'pencurian',
-                       'copet', 'jambret', 'kriminal']
+    # One pass over the text for every severity lexicon
+    matches = keyword_classifier.scan(combined_text)
     
     # Check severity
-    if any(keyword in combined_text for keyword in high_severity):
+    if matches['news_high']:
         return 'high'
-    elif any(keyword in combined_text for keyword in medium_severity):
+    elif matches['news_medium']:
         return 'medium'
     else:
         return 'low'
@@ -383,21 +608,68 @@ def calculate_news_impact_on_safety(news_results: List[Dict], base_score: float)
         'severity_summary': severity_counts
     }
 
+# Driver Matching Functions
+def set_driver_status(row: int, status: str):
+    """Change a driver's status and add or remove them from matching"""
+    MOCK_DRIVERS.update_status(row, status)
+    driver_index.set_active(row, status == 'active')
+
+def match_driver(pickup_coords: tuple) -> DriverView:
+    """Pick the safest of the nearest active drivers to the pickup point
+    and mark them busy until ``release_driver``"""
+    with driver_status_lock:
+        candidates = driver_index.nearest(pickup_coords[0], pickup_coords[1], k=MATCH_CANDIDATES)
+        if candidates:
+            # Among the nearby drivers prefer the safest one
+            row = int(MOCK_DRIVERS.rank_by_safety([row for row, _ in candidates])[0])
+        else:
+            # Nobody active in the index, keep the demo working
+            row = random.randrange(len(MOCK_DRIVERS))
+        driver = MOCK_DRIVERS[row]
+        driver_rides[driver.id] = driver_rides.get(driver.id, 0) + 1
+        set_driver_status(row, 'busy')
+        return driver
+
+def release_driver(driver_id: str):
+    """Make a driver matchable again once their ride is over"""
+    with driver_status_lock:
+        remaining = driver_rides.pop(driver_id, 1) - 1
+        if remaining:
+            driver_rides[driver_id] = remaining
+            return
+        row = MOCK_DRIVERS.index_of(driver_id)
+        # Leave drivers who went offline meanwhile alone
+        if MOCK_DRIVERS[row].status == 'busy':
+            set_driver_status(row, 'active')
+
 # AI Safety Analysis Functions
+def risk_cache_key(driver: Driver, pickup: str, dropoff: str, time_of_day: int) -> tuple:
+    """Canonical features the Qwen risk prompt depends on"""
+    return (driver.id, time_of_day - time_of_day % RISK_HOUR_BUCKET, pickup, dropoff)
+
 def calculate_ride_risk_score(driver: Driver, pickup: str, dropoff: str, time_of_day: int) -> Dict:
     """Calculate risk score using Qwen AI or fallback"""
     if ai_assistant:
+        key = risk_cache_key(driver, pickup, dropoff, time_of_day)
+        # The prompt is built from the key's features only, so every ride
+        # sharing a key would have produced the same request
         ride_data = {
             "driver_name": driver.name,
             "driver_rating": driver.rating,
             "driver_rides": driver.total_rides,
-            "time": f"{time_of_day}:00",
+            "time": f"{key[1]}:00",
             "pickup": MOCK_LOCATIONS[pickup]['name'],
             "dropoff": MOCK_LOCATIONS[dropoff]['name']
         }
-        return ai_assistant.analyze_ride_safety(ride_data)
-    
-    # Fallback calculation
+        analysis = risk_cache.get_or_compute(
+            key,
+            lambda: ai_assistant.analyze_ride_safety(ride_data),
+            cache_if=lambda analysis: not analysis.get('fallback')
+        )
+        # Callers adjust the result in place, keep the cached copy intact
+        return copy.deepcopy(analysis)
+    
+    # Fallback calculation (fleet views read the score precomputed at load time)
     base_score = driver.safety_score
     time_factor = 1.0
     if time_of_day >= 22 or time_of_day <= 5:
@@ -437,40 +709,14 @@ def analyze_voice_sentiment(text: str, context: Dict = None) -> Dict:
     
     """Analyze voice sentiment using Qwen AI or fallback"""
     if ai_assistant:
-        return ai_assistant.analyze_voice_distress(text, context or {})
+        # Batched with voice checks from other rides
+        return voice_batcher.analyze(text, context or {})
     
     # Append
     total_text.append(text)
     
-    # Fallback analysis
-    distress_keywords = ["help", "stop", "wrong", "scared", "please", "no", "hurt"]
-    concern_keywords = ["uncomfortable", "weird", "strange", "lost", "where"]
-    
-    text_lower = text.lower()
-    distress_count = sum(1 for word in distress_keywords if word in text_lower)
-    concern_count = sum(1 for word in concern_keywords if word in text_lower)
-    
-    if distress_count >= 2:
-        return {
-            "distress_level": "DISTRESS",
-            "confidence": 0.9,
-            "ai_response": "I've detected you might be in distress. Would you like me to contact emergency services?",
-            "actions": ["contact_emergency", "share_location", "silent_alarm"]
-        }
-    elif distress_count >= 1 or concern_count >= 2:
-        return {
-            "distress_level": "CONCERN",
-            "confidence": 0.7,
-            "ai_response": "I noticed you might be uncomfortable. How can I help you feel safer?",
-            "actions": ["share_location", "call_support"]
-        }
-    else:
-        return {
-            "distress_level": "NORMAL",
-            "confidence": 0.8,
-            "ai_response": "Your ride is progressing smoothly. I'm here if you need anything!",
-            "actions": []
-        }
+    # Fallback analysis (distinct distress/concern keywords, one scan)
+    return classify_distress(text)
 
 # Routes
 @app.route('/')
@@ -489,7 +735,7 @@ def book_ride():
 def calculate_risk():
     """API endpoint for risk calculation with news integration"""
     data = request.json
-    driver = random.choice(MOCK_DRIVERS)
+    driver = match_driver(MOCK_LOCATIONS[data['pickup']]['coords'])
     
     # Get base risk analysis
     risk_analysis = calculate_ride_risk_score(
@@ -554,22 +800,8 @@ def calculate_risk():
     
 def extract_area_name(location: str) -> str:
     """Extract area name from full location string"""
-    # Common Jakarta area mappings
-    area_mappings = {
-        'Sudirman': ['Sudirman', 'Jalan Sudirman'],
-        'Kemang': ['Kemang', 'Jalan Kemang'],
-        'Senayan': ['Senayan', 'Jalan Senayan'],
-        'Thamrin': ['Thamrin', 'Grand Indonesia'],
-        'Blok M': ['Blok M', 'Pasaraya'],
-        'Serpong': ['Serpong', 'BSD'],
-        'PIK': ['PIK', 'Pantai Indah Kapuk'],
-        'Kelapa Gading': ['Kelapa Gading', 'Gading'],
-        'Pondok Indah': ['Pondok Indah', 'PI'],
-        'Kuningan': ['Kuningan', 'Rasuna Said']
-    }
-    
     location_lower = location.lower()
-    for area, keywords in area_mappings.items():
+    for area, keywords in AREA_MAPPINGS.items():
         for keyword in keywords:
             if keyword.lower() in location_lower:
                 return area
@@ -599,13 +831,91 @@ def api_search_news():
     })
 
 
+@app.route('/api/metrics')
+def api_metrics():
+    """Cache and background worker metrics"""
+    return jsonify({
+        "news_cache": news_cache.stats(),
+        "risk_cache": risk_cache.stats(),
+        "news_prefetcher": news_prefetcher.status(),
+        "voice_batcher": voice_batcher.stats() if voice_batcher else None,
+        "report_jobs": report_jobs.stats(),
+        "ride_bus": ride_bus.stats(),
+        "pdf_cache": pdf_cache.stats(),
+        "report_exporter": report_exporter.stats(),
+        "active_rides": active_rides.stats(),
+        "ride_scheduler": {**ride_scheduler.stats(), "monitored_rides": len(ride_monitors)},
+        "timestamp": datetime.now().isoformat()
+    })
+
+@app.route('/api/lexicons/reload', methods=['POST'])
+def reload_lexicons():
+    """Recompile the keyword lexicons without restarting.
+
+    Only re-reads the configured GOGUARD_LEXICON_FILE (or the built-in
+    lexicons); lexicons are never taken from the request, so callers can't
+    weaken distress detection.
+    """
+    try:
+        if os.environ.get('GOGUARD_LEXICON_FILE'):
+            keyword_classifier.load_file(os.environ['GOGUARD_LEXICON_FILE'])
+        else:
+            keyword_classifier.reload()
+    except (OSError, ValueError, AttributeError, TypeError) as e:
+        # The lexicons in use are only replaced once the new ones compile
+        return jsonify({"error": f"Invalid lexicon file: {e}"}), 500
+    
+    return jsonify({
+        "status": "reloaded",
+        "labels": keyword_classifier.labels
+    })
+
+@app.route('/api/driver-location/<driver_id>', methods=['POST'])
+def update_driver_location(driver_id):
+    """Incremental position update for one driver"""
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({"error": "Expected a JSON object with lat and lng"}), 400
+    
+    try:
+        row = MOCK_DRIVERS.index_of(driver_id)
+    except KeyError:
+        return jsonify({"error": "Driver not found"}), 404
+    
+    try:
+        lat, lng = float(data['lat']), float(data['lng'])
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"error": "lat and lng must be numbers"}), 400
+    # Also rejects NaN, which fails every comparison
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return jsonify({"error": "lat must be within [-90, 90] and lng within [-180, 180]"}), 400
+    
+    status = data.get('status')
+    if status is not None and status not in DRIVER_STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(DRIVER_STATUSES)}"}), 400
+    
+    MOCK_DRIVERS.update_location(row, lat, lng)
+    driver_index.update_position(row, lat, lng)
+    
+    if status is not None:
+        with driver_status_lock:
+            set_driver_status(row, status)
+    
+    return jsonify({
+        "driver_id": driver_id,
+        "last_location": [lat, lng],
+        "status": MOCK_DRIVERS[row].status
+    })
+
+
 @app.route('/api/start-ride', methods=['POST'])
 def start_ride():
     """Start a ride and initialize GoGuard monitoring"""
     data = request.json
-    ride_id = f"RIDE_{int(time.time())}"
+    ride_id = new_id("RIDE")
     
-    driver = MOCK_DRIVERS[random.randrange(0, len(MOCK_DRIVERS))]  # Use Yadi Riyadi for demo
+    # Rides keep their own snapshot of the driver, not a view into the fleet
+    driver = match_driver(MOCK_LOCATIONS[data['pickup']]['coords']).to_driver()
     ride = Ride(
         id=ride_id,
         driver=driver,
@@ -622,11 +932,12 @@ def start_ride():
         is_safe_triggered=False,
     )
     
-    active_rides[ride_id] = ride
+    active_rides.put(ride_id, ride)
+    ride_timings.set(ride_id, ride)
     session['current_ride'] = ride_id
     
-    # Start monitoring thread
-    threading.Thread(target=monitor_ride, args=(ride_id,), daemon=True).start()
+    # Schedule periodic monitoring
+    ride_monitors[ride_id] = ride_scheduler.call_every(MONITOR_INTERVAL, monitor_ride, ride_id)
     
     return jsonify({
         "ride_id": ride_id,
@@ -637,30 +948,47 @@ def start_ride():
 @app.route('/ride-monitor/<ride_id>')
 def ride_monitor(ride_id):
     """Real-time ride monitoring dashboard"""
-    if ride_id not in active_rides:
+    ride = active_rides.get(ride_id)
+    if ride is None:
         return "Ride not found", 404
     
-    ride = active_rides[ride_id]
     return render_template('ride_monitor.html', ride=ride)
 
 @app.route('/api/ride-status/<ride_id>')
 def ride_status(ride_id):
-    """Get current ride status and safety events"""
-    if ride_id not in active_rides:
+    """Get current ride status and the safety events after ?since=<seq>,
+    or follow them as server-sent events"""
+    since = max(0, request.args.get('since', 0, type=int))
+    
+    if wants_event_stream():
+        # A reconnecting EventSource resumes after the last event it saw
+        since = max(since, last_event_id())
+        # Subscribe before the snapshot so no update falls between the two
+        subscription = ride_bus.subscribe(ride_id)
+        snapshot = ride_status_snapshot(ride_id, since)
+        if snapshot is None:
+            subscription.close()
+            return jsonify({"error": "Ride not found"}), 404
+        start_progress_pusher()
+        return event_stream(follow_ride(ride_id, subscription, snapshot))
+    
+    # The body is fully determined by the ride's version, the cursor and
+    # the clock, so an unchanged poll is answered without building it
+    version = active_rides.version(ride_id)
+    ride = ride_timing(ride_id)
+    if version is None or ride is None:
         return jsonify({"error": "Ride not found"}), 404
     
-    ride = active_rides[ride_id]
-    elapsed = (datetime.now() - ride.start_time).seconds / 60
-    progress = min(100, (elapsed / ride.estimated_duration) * 100)
+    progress = ride_progress(ride)
+    etag = f"{ride_id}-v{version}-{since}-{progress['progress']}-{progress['elapsed_minutes']}"
+    if not_modified(etag):
+        return with_validators(Response(status=304), etag)
     
-    return jsonify({
-        "ride_id": ride_id,
-        "status": ride.status,
-        "progress": round(progress, 1),
-        "elapsed_minutes": round(elapsed, 1),
-        "safety_events": ride.safety_events,
-        "current_location": simulate_current_location(ride, progress)
-    })
+    snapshot = ride_status_snapshot(ride_id, since, progress)
+    if snapshot is None:
+        return jsonify({"error": "Ride not found"}), 404
+    
+    return with_validators(jsonify(snapshot), etag)
 
 @app.route('/api/voice-check', methods=['POST'])
 def voice_check():
@@ -669,11 +997,10 @@ def voice_check():
     ride_id = data.get('ride_id')
     voice_text = data.get('text', '')
     
-    if ride_id not in active_rides:
+    ride = active_rides.update(ride_id, lambda ride: ride.transcripts.append(voice_text) or ride, default=None)
+    if ride is None:
         return jsonify({"error": "Ride not found"}), 404
     
-    ride = active_rides[ride_id]
-    ride.transcripts.append(voice_text)
     elapsed = (datetime.now() - ride.start_time).seconds / 60
     
     context = {
@@ -682,15 +1009,23 @@ def voice_check():
     }
     
     sentiment = analyze_voice_sentiment(voice_text, context)
-    ride.is_safe_triggered = ride.is_safe_triggered or sentiment["is_safe_triggered"]
     
-    if sentiment['distress_level'] in ['DISTRESS', 'CONCERN']:
-        active_rides[ride_id].safety_events.append({
-            "timestamp": datetime.now().isoformat(),
-            "type": "VOICE_ALERT",
-            "level": sentiment['distress_level'],
-            "details": f"Voice analysis detected {sentiment['distress_level']}"
-        })
+    def record(ride):
+        ride.is_safe_triggered = ride.is_safe_triggered or sentiment["is_safe_triggered"]
+        if sentiment['distress_level'] in ['DISTRESS', 'CONCERN']:
+            event = {
+                "timestamp": datetime.now().isoformat(),
+                "type": "VOICE_ALERT",
+                "level": sentiment['distress_level'],
+                "details": f"Voice analysis detected {sentiment['distress_level']}"
+            }
+            ride.safety_events.append(event)
+            return event, len(ride.safety_events)
+    
+    # The ride may have ended while the voice check ran; nothing to record then
+    recorded = active_rides.update(ride_id, record, default=None)
+    if recorded is not None:
+        publish_safety_event(ride_id, *recorded)
     
     return jsonify(sentiment)
 
@@ -701,16 +1036,16 @@ def emergency_action():
     ride_id = data.get('ride_id')
     action = data.get('action')
     
-    if ride_id not in active_rides:
-        return jsonify({"error": "Ride not found"}), 404
-    
-    ride = active_rides[ride_id]
-    ride.safety_events.append({
+    event = {
         "timestamp": datetime.now().isoformat(),
         "type": "EMERGENCY_ACTION",
         "action": action,
         "status": "TRIGGERED"
-    })
+    }
+    seq = active_rides.append_event(ride_id, event)
+    if not seq:
+        return jsonify({"error": "Ride not found"}), 404
+    publish_safety_event(ride_id, event, seq)
     
     response = {
         "action": action,
@@ -720,142 +1055,303 @@ def emergency_action():
     
     if action == "contact_emergency":
         response["message"] = "Emergency services have been notified. Help is on the way."
-        response["emergency_id"] = f"EMG_{int(time.time())}"
+        response["emergency_id"] = new_id("EMG")
     elif action == "share_location":
         response["message"] = "Your location has been shared with trusted contacts."
         response["shared_with"] = ["Mom", "Best Friend"]
     elif action == "silent_alarm":
         response["message"] = "Silent alarm activated. GoOps team is monitoring your ride."
-        response["monitoring_id"] = f"MON_{int(time.time())}"
+        response["monitoring_id"] = new_id("MON")
     
     return jsonify(response)
 
 @app.route('/api/end-ride/<ride_id>', methods=['POST'])
 def end_ride(ride_id):
     """End ride and generate safety report"""
-    if ride_id not in active_rides:
+    # Mark the report pending before the ride disappears, so other workers
+    # always see one or the other
+    marked = ride_reports.mark_pending(ride_id, replace=False)
+    # Only one caller can pop the ride, and no other request mutates it afterwards
+    ride = active_rides.pop(ride_id)
+    if ride is None:
+        if marked:
+            ride_reports.clear_pending(ride_id)
         return jsonify({"error": "Ride not found"}), 404
     
-    ride = active_rides[ride_id]
     ride.status = "COMPLETED"
+    release_driver(ride.driver.id)
     
-    # Generate safety report
-    ride_reports[ride_id] = generate_safety_report(ride)
+    # Generate the safety report in the background and hand back a handle
+    job = report_jobs.submit(lambda job: run_report_job(job, ride), key=ride_id)
     
-    del active_rides[ride_id]
+    stop_monitoring(ride_id)
+    ride_timings.pop(ride_id)
     session.pop('current_ride', None)
     
+    # Tell streaming ride monitors, then end their streams
+    ride_bus.publish(ride_id, {"type": "status", "status": "COMPLETED", "report_url": f"/safety-report/{ride_id}"})
+    ride_bus.close_topic(ride_id)
+    
+    if wants_event_stream():
+        return event_stream(follow_report_job(job))
+    
     return jsonify({
         "status": "COMPLETED",
-        "safety_report": ride_reports[ride_id]
-    })
+        "report": report_handle(ride_id, job)
+    }), 202
+
+@app.route('/api/report-status/<ride_id>')
+def report_status(ride_id):
+    """Poll a safety report job, or follow it as server-sent events"""
+    job = report_jobs.get_by_key(ride_id)
+    if job is None:
+        if ride_id in ride_reports:
+            return jsonify({"ride_id": ride_id, "status": "DONE", "ready": True,
+                            "report_url": f"/safety-report/{ride_id}"})
+        pending = report_pending(ride_id)
+        if pending is None:
+            return jsonify({"error": "Report not found"}), 404
+        
+        # Another worker process runs the job: follow it through the report store
+        if wants_event_stream():
+            return event_stream(follow_stored_report(ride_id))
+        return jsonify({
+            "ride_id": ride_id,
+            "status": pending['status'],
+            "error": pending['error'],
+            "ready": False,
+            "status_url": f"/api/report-status/{ride_id}",
+            "report_url": f"/safety-report/{ride_id}",
+        })
+    
+    if wants_event_stream():
+        return event_stream(follow_report_job(job, last_event_id()))
+    
+    return jsonify({**report_handle(ride_id, job), "ready": job.status == 'DONE'})
 
 @app.route('/safety-report/<ride_id>')
 def safety_report(ride_id):
     """Display post-ride safety report"""
     
-    print("===== DEBUGGING =========")
-    print(ride_reports)
-
-    mock_report = {
-        "ride_id": ride_id,
-        "overall_safety_score": 0.92,
-        "duration": f"{ride_reports[ride_id]['duration']}",
-        "route_compliance": "98%",
-        "driver_behavior": "Excellent",
-        "incidents": 0,
-        "ai_interventions": 1,
-        "recommendations": [
-            "Consider using Safe Route mode for late-night rides",
-            "Your trusted contacts were successfully notified"
-        ],
-        'transcript': " ".join(total_text),
-        'qwen_response': ride_reports[ride_id]['qwen_response'],
-    }
-    
+    version = ride_reports.version(ride_id)
+    if version is None:
+        # Active first: end_ride marks the report pending before popping the ride
+        ride_active = ride_id in active_rides
+        if (ride_active or report_jobs.get_by_key(ride_id) is not None
+                or report_pending(ride_id) is not None):
+            # Pending state: the page follows the report job as it streams in,
+            # waiting for the ride to be ended elsewhere if it is still active
+            return render_template('safety_report.html', report={
+                "ride_id": ride_id,
+                "pending": True,
+                "ride_active": ride_active,
+            })
+        return "Report not found", 404
     
-    print("======== DEBUGGING =======")
-    print(ride_reports[ride_id]['qwen_response'])
+    # Reports only change when regenerated; don't re-render an unchanged one
+    report_version, stored_at = version
+    etag = f"{ride_id}-report-v{report_version}"
+    if not_modified(etag, stored_at):
+        return with_validators(Response(status=304), etag, stored_at)
     
-    return render_template('safety_report.html', report={"ride_id": ride_id, **ride_reports[ride_id]})
+    page = render_template('safety_report.html', report={"ride_id": ride_id, **ride_reports[ride_id]})
+    return with_validators(make_response(page), etag, stored_at)
 
 @app.route('/download-report/<ride_id>')
 def download_report(ride_id):
-    print("DOWNLOAD REPORT", ride_id)
+    version = ride_reports.version(ride_id)
+    if version is None:
+        return "Report not found", 404
+    
+    # Building the PDF is the expensive part; skip it for an unchanged report
+    report_version, stored_at = version
+    etag = f"{ride_id}-pdf-v{report_version}"
+    if not_modified(etag, stored_at):
+        return with_validators(Response(status=304), etag, stored_at)
     
     data = ride_reports[ride_id]
     
-    print("Data", data)
-
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title = Paragraph("Ride Safety Report", styles['Title'])
-    elements.append(title)
-    elements.append(Spacer(1, 12))
-
-    # Overview
-    overview_data = [
-        ["ID", data.get("id", "RIDE_NULL")],
-        ["Safety Score", data.get("safety_score", "")],
-        ["Driver", f'{data["driver"]["name"]} ({data["driver"]["phone"]})'],
-        ["Driver Rating", data["driver"]["rating"]],
-        ["Driver Vehicle", f'{data["driver"]["vehicle_color"]} {data["driver"]["vehicle_model"]} {data["driver"]["vehicle_number"]}'],
-        ["Pickup", f'{data.get("pickup_location", "Unknown")} {data.get("pickup_coords", "")}'],
-        ["Dropoff", f'{data.get("dropoff_location", "Unknown")} {data.get("dropoff_coords", "")}'],
-        ["Route Type", data.get("route_type", "")],
-        ["Duration", data.get("duration", "")],
-        # ["Incidents", data.get("incidents", "")],
-        ["Transcripts", data.get("transcripts", [])],
-        ["Recommendations", ', '.join(data.get("recommendations", []))],
-        ["Summary", data.get("qwen_response", "")],
-    ]
-    for key, value in overview_data:
-        elements.append(Paragraph(f"<b>{key}:</b> {value}", styles['Normal']))
-    elements.append(Spacer(1, 12))
-
-    # Safety Events
-    events = data.get("safety_events", [])
-    if events:
-        event_keys = list(events[0].keys())
-        table_data = [event_keys]  # headers
-        for event in events:
-            table_data.append([str(event.get(k, "")) for k in event_keys])
-
-        table = Table(table_data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ]))
-        elements.append(Paragraph("Safety Events", styles['Heading2']))
-        elements.append(table)
-
-    doc.build(elements)
-    buffer.seek(0)
-
-    return send_file(
-        buffer,
-        as_attachment=True,
-        download_name='ride_report.pdf',
-        mimetype='application/pdf'
+    # Rendered once per report content, usually already by the report job;
+    # a cached file pruned between the lookup and sending it is rendered again
+    for _ in range(2):
+        pdf = pdf_cache.get_or_render(data)
+        try:
+            response = send_file(
+                pdf if isinstance(pdf, str) else io.BytesIO(pdf),
+                as_attachment=True,
+                download_name='ride_report.pdf',
+                mimetype='application/pdf'
+            )
+            break
+        except FileNotFoundError:
+            continue
+    else:
+        return "Report PDF unavailable, please retry", 503
+    return with_validators(response, etag, stored_at)
+
+@app.route('/api/reports/export', methods=['GET', 'POST'])
+def export_reports():
+    """Stream many safety report PDFs as one zip.
+
+    Select reports by ride id (JSON "ride_ids", or repeated ?ride_id=) or by
+    when the ride started ("start"/"end": ISO 8601 or epoch seconds).
+    """
+    params = request.get_json(silent=True) or {}
+    if not isinstance(params, dict):
+        return jsonify({"error": "Expected a JSON object"}), 400
+    ride_ids = params.get('ride_ids') or request.args.getlist('ride_id')
+    start = params.get('start', request.args.get('start'))
+    end = params.get('end', request.args.get('end'))
+    
+    try:
+        ride_ids = select_ride_ids(ride_reports, ride_ids, start, end)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return Response(
+        report_exporter.export_zip(ride_reports, ride_ids, cache=pdf_cache),
+        mimetype='application/zip',
+        headers={
+            'Content-Disposition': f'attachment; filename=ride_reports_{datetime.now():%Y%m%d_%H%M%S}.zip',
+            'X-Accel-Buffering': 'no',
+        }
     )
 
 # Helper Functions
 def monitor_ride(ride_id):
-    """Background thread to monitor ride"""
-    while ride_id in active_rides and active_rides[ride_id].status == 'ACTIVE':
-        time.sleep(10)
-        
-        if random.random() < 0.05:
-            active_rides[ride_id].safety_events.append({
-                "timestamp": datetime.now().isoformat(),
-                "type": "ROUTE_DEVIATION",
-                "details": "Minor route adjustment detected"
-            })
+    """Periodic ride check, run by ride_scheduler every MONITOR_INTERVAL seconds"""
+    if ride_id not in active_rides:
+        stop_monitoring(ride_id)
+        return
+    
+    if random.random() < 0.05:
+        event = {
+            "timestamp": datetime.now().isoformat(),
+            "type": "ROUTE_DEVIATION",
+            "details": "Minor route adjustment detected"
+        }
+        seq = active_rides.append_event(ride_id, event)
+        if seq:
+            publish_safety_event(ride_id, event, seq)
+
+def stop_monitoring(ride_id):
+    handle = ride_monitors.pop(ride_id, None)
+    if handle is not None:
+        handle.cancel()
+
+def ride_progress(ride: Ride) -> Dict:
+    """Progress fields of the ride status, derived from the clock"""
+    elapsed = (datetime.now() - ride.start_time).seconds / 60
+    progress = round(min(100, (elapsed / ride.estimated_duration) * 100), 1)
+    return {
+        "progress": progress,
+        "elapsed_minutes": round(elapsed, 1),
+        "current_location": simulate_current_location(ride, progress),
+    }
+
+def ride_timing(ride_id: str) -> Optional[Ride]:
+    """The ride as far as ride_progress needs it, without loading it on every poll"""
+    return ride_timings.get_or_compute(ride_id, lambda: active_rides.get(ride_id),
+                                       cache_if=lambda ride: ride is not None)
+
+def ride_status_snapshot(ride_id: str, since: int = 0, progress: Optional[Dict] = None) -> Optional[Dict]:
+    """Ride status with the safety events after seq ``since``, or None when the ride isn't active.
+
+    safety_events is append-only, so each event's seq is its 1-based
+    position; ``last_seq`` is the cursor for the next call. A cursor past
+    the end (e.g. from another ride's page) starts over from 0. Pass
+    ``progress`` to reuse fields already computed for the ETag.
+    """
+    def read(ride):
+        # Consistent copy of the fields other requests mutate; only the new events
+        count = len(ride.safety_events)
+        start = since if since <= count else 0
+        return ride, ride.status, start, count, ride.safety_events[start:]
+    
+    snapshot = active_rides.read(ride_id, read, default=None)
+    if snapshot is None:
+        return None
+    
+    ride, status, start, count, safety_events = snapshot
+    return {
+        "ride_id": ride_id,
+        "status": status,
+        **(progress or ride_progress(ride)),
+        "since": start,
+        "last_seq": count,
+        "safety_events": [{**event, "seq": seq} for seq, event in enumerate(safety_events, start + 1)],
+    }
+
+def publish_safety_event(ride_id: str, event: Dict, seq: int):
+    ride_bus.publish(ride_id, {"type": "safety_event", "event": {**event, "seq": seq}})
+
+def push_ride_progress():
+    """Progress tick for every ride someone is streaming; unwatched rides cost nothing"""
+    if not progress_push_lock.acquire(blocking=False):
+        return
+    try:
+        watched = ride_bus.topics()
+        for ride_id in watched:
+            progress = active_rides.read(ride_id, ride_progress, default=None)
+            if progress is not None and progress_sent.get(ride_id) != progress['progress']:
+                progress_sent[ride_id] = progress['progress']
+                ride_bus.publish(ride_id, {"type": "progress", **progress})
+        for ride_id in set(progress_sent) - set(watched):
+            progress_sent.pop(ride_id, None)
+    finally:
+        progress_push_lock.release()
+
+def start_progress_pusher():
+    """Schedule push_ride_progress on first use, in the process serving streams"""
+    global progress_pusher
+    with progress_pusher_lock:
+        if progress_pusher is None:
+            progress_pusher = ride_scheduler.call_every(PROGRESS_INTERVAL, push_ride_progress)
+
+def follow_ride(ride_id: str, subscription: Subscription, snapshot: Dict):
+    """Server-sent events for one ride: a "snapshot", then only what changes.
+
+    Pushes "safety_event", "progress" and "status" events from ride_bus;
+    the stream ends after the ride's final "status" event, which is also
+    sent when an idle check finds the ride gone from the store. Snapshots and
+    safety events carry their seq as the event id, so a reconnecting client
+    resumes after the last one it saw; a client that falls behind gets a
+    fresh snapshot of what it missed instead of its backlog.
+    """
+    try:
+        # Concurrent appends may publish out of seq order, so track what was
+        # sent: everything up to the snapshot's last_seq, plus later seqs
+        covered, sent = snapshot['last_seq'], set()
+        yield sse_event('snapshot', snapshot, covered)
+        while True:
+            events, ended = subscription.get(timeout=15)
+            for event in events:
+                if event is OVERFLOW:
+                    snapshot = ride_status_snapshot(ride_id, covered)
+                    if snapshot is not None:
+                        covered, sent = snapshot['last_seq'], set()
+                        yield sse_event('snapshot', snapshot, covered)
+                    continue
+                if event['type'] == 'safety_event':
+                    seq = event['event']['seq']
+                    if seq <= covered or seq in sent:
+                        continue
+                    sent.add(seq)
+                    yield sse_event('safety_event', event['event'], seq)
+                    continue
+                yield sse_event(event['type'], {k: v for k, v in event.items() if k != 'type'})
+            
+            if ended:
+                return
+            if not events:
+                # Another worker may have ended the ride; its status event
+                # only reaches that worker's subscribers
+                if active_rides.version(ride_id) is None:
+                    yield sse_event('status', {"status": "COMPLETED", "report_url": f"/safety-report/{ride_id}"})
+                    return
+                yield ": keep-alive\n\n"
+    finally:
+        subscription.close()
 
 def simulate_current_location(ride, progress):
     """Simulate current location based on progress"""
@@ -871,6 +1367,153 @@ def simulate_current_location(ride, progress):
         "address": f"En route - {round(progress)}% completed"
     }
 
+def summary_ride_data(ride: Ride) -> Dict:
+    """Ride fields the Qwen summary prompt uses"""
+    return {
+        "duration": f"{(datetime.now() - ride.start_time).seconds // 60} minutes",
+        "route_type": ride.route_type,
+        "events": ride.safety_events,
+        "is_safe_triggered": ride.is_safe_triggered,
+    }
+
+def sse_event(event: str, data, event_id: Optional[int] = None) -> str:
+    """Format one server-sent event"""
+    prefix = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{prefix}event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def not_modified(etag: str, last_modified: Optional[float] = None) -> bool:
+    """Whether the client's cached copy (If-None-Match, else If-Modified-Since) is current"""
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        return int(last_modified) <= request.if_modified_since.timestamp()
+    return False
+
+def with_validators(response: Response, etag: str, last_modified: Optional[float] = None) -> Response:
+    """Strong ETag (and Last-Modified) for a response clients must revalidate"""
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = datetime.fromtimestamp(last_modified, tz=timezone.utc)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def last_event_id() -> int:
+    """Cursor an EventSource sends when it reconnects"""
+    try:
+        return max(0, int(request.headers.get('Last-Event-ID', 0)))
+    except ValueError:
+        return 0
+
+def wants_event_stream() -> bool:
+    return request.args.get('stream') == '1' or 'text/event-stream' in request.headers.get('Accept', '')
+
+def event_stream(events) -> Response:
+    return Response(
+        events,
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+def report_handle(ride_id: str, job: Job) -> Dict:
+    """What clients need to follow a report job"""
+    return {
+        **job.to_dict(),
+        "ride_id": ride_id,
+        "status_url": f"/api/report-status/{ride_id}",
+        "report_url": f"/safety-report/{ride_id}",
+    }
+
+def report_pending(ride_id: str) -> Optional[Dict]:
+    """The report store's pending marker for a ride, unless it has gone stale"""
+    pending = ride_reports.pending(ride_id)
+    if pending is None or time.time() - pending['updated_at'] > REPORT_PENDING_TTL:
+        return None
+    return pending
+
+def run_report_job(job: Job, ride: Ride) -> Dict:
+    """Report job body; keeps the shared pending marker in step with the job"""
+    # Refreshed on every attempt so retries never look stale
+    ride_reports.mark_pending(ride.id)
+    try:
+        return build_safety_report(job, ride)
+    except Exception as e:
+        if job.attempts >= report_jobs.max_attempts:
+            ride_reports.mark_pending(ride.id, FAILED, str(e))
+        raise
+
+def build_safety_report(job: Job, ride: Ride) -> Dict:
+    """Report job: streams summary tokens into the job's events and stores the report.
+
+    A fallback summary (Qwen unavailable) or one cut short by a stream error
+    is retried with backoff; the last attempt keeps it so the rider always
+    gets a report.
+    """
+    if not ai_assistant:
+        report = generate_safety_report(ride)
+    else:
+        summary = None
+        for event in ai_assistant.stream_ride_summary(summary_ride_data(ride)):
+            if event['type'] == 'summary':
+                summary = event['summary']
+            else:
+                job.publish(event)
+        
+        if job.attempts < REPORT_MAX_ATTEMPTS:
+            if summary.get('fallback'):
+                raise RuntimeError("Qwen summary unavailable")
+            if summary.get('truncated'):
+                raise RuntimeError("Qwen summary stream failed")
+        report = {**asdict(ride), **summary}
+    
+    ride_reports[ride.id] = report
+    
+    # Render the PDF now so downloads are served from the cache (from the
+    # stored copy, which is what download_report reads back)
+    try:
+        pdf_cache.get_or_render(ride_reports[ride.id])
+    except Exception as e:
+        print(f"Report PDF prebuild failed for {ride.id}: {e!r}")
+    return report
+
+def follow_stored_report(ride_id: str, interval: float = 2.0):
+    """Server-sent events for a report another worker process is generating.
+
+    Ends with "report" once the report is stored, or "failed"; the token
+    stream is only available from the worker running the job.
+    """
+    while True:
+        report = ride_reports.get(ride_id)
+        if report is not None:
+            yield sse_event('report', report)
+            return
+        pending = report_pending(ride_id)
+        if pending is None or pending['status'] == FAILED:
+            yield sse_event('failed', {"error": pending['error'] if pending else "Report not found"})
+            return
+        yield ": keep-alive\n\n"
+        time.sleep(interval)
+
+def follow_report_job(job: Job, cursor: int = 0):
+    """Server-sent events for a report job, resumable from an event index.
+
+    Replays the job's "token", "score" and "retry" events, then ends with
+    "report" (the stored report) or "failed".
+    """
+    while True:
+        events, finished = job.events_since(cursor, timeout=15)
+        for event in events:
+            cursor += 1
+            yield sse_event(event['type'], {k: v for k, v in event.items() if k != 'type'}, cursor)
+        
+        if finished:
+            if job.status == FAILED:
+                yield sse_event('failed', {"error": job.error})
+            else:
+                yield sse_event('report', job.result)
+            return
+        if not events:
+            yield ": keep-alive\n\n"
+
 def generate_safety_report(ride: Ride):
     """Generate post-ride safety report"""
 
@@ -878,12 +1521,7 @@ def generate_safety_report(ride: Ride):
     print(ai_assistant)
     
     if ai_assistant:
-        ride_data = {
-            "duration": f"{(datetime.now() - ride.start_time).seconds // 60} minutes",
-            "route_type": ride.route_type,
-            "events": ride.safety_events,
-            "is_safe_triggered": ride.is_safe_triggered,
-        }
+        ride_data = summary_ride_data(ride)
         test_output = ai_assistant.summarize_ride_safety(ride_data)
         
         print("===== DEBUGGING - AI ASSISTANT =========")
@@ -914,6 +1552,7 @@ if __name__ == '__main__':
     
     # Load the data
     MOCK_DRIVERS, MOCK_LOCATIONS, location_mapping = load_csv_data()
+    driver_index = DriverGridIndex.from_fleet(MOCK_DRIVERS)
     
     # Create base template with enhanced stylin
     base_html = '''<!DOCTYPE html>
@@ -1693,6 +2332,11 @@ document.getElementById('safetyModal').addEventListener('click', function(e) {
 <script>
 const rideId = '{{ ride.id }}';
 let updateInterval;
+let rideStream = null;
+let rideFinished = false;
+// Safety events by seq; the server sends only those after lastSeq
+let safetyEvents = {};
+let lastSeq = 0;
 let voiceRecognition = null;
 let isListening = false;
 
@@ -1840,45 +2484,111 @@ function analyzeVoice(text) {
     });
 }
 
+function renderProgress(data) {
+    document.getElementById('progressBar').style.width = data.progress + '%';
+    document.getElementById('elapsedTime').textContent = Math.round(data.elapsed_minutes);
+    
+    // Check if ride completed
+    if (data.progress >= 100) {
+        finishRide(true);
+    }
+}
+
+function renderSafetyEvents() {
+    const events = Object.values(safetyEvents).sort((a, b) => a.seq - b.seq);
+    if (events.length > 0) {
+        const eventsHtml = events.map(event => {
+            const eventClass = event.level === 'DISTRESS' ? 'distress' : '';
+            const time = new Date(event.timestamp).toLocaleTimeString();
+            return `
+                <div class="safety-event ${eventClass}">
+                    <strong>${event.type}</strong> - ${time}
+                    <p style="font-size: 14px; margin-top: 4px;">${event.details || ''}</p>
+                </div>
+            `;
+        }).join('');
+        document.getElementById('safetyEvents').innerHTML = eventsHtml;
+    }
+}
+
+function addSafetyEvents(events) {
+    events.forEach(event => {
+        safetyEvents[event.seq] = event;
+        lastSeq = Math.max(lastSeq, event.seq);
+    });
+    renderSafetyEvents();
+}
+
+function applyRideStatus(data) {
+    // since is 0 when the server starts the list over
+    if (data.since === 0) safetyEvents = {};
+    addSafetyEvents(data.safety_events);
+    lastSeq = data.last_seq;
+    renderProgress(data);
+}
+
+function finishRide(endRide) {
+    if (rideFinished) return;
+    rideFinished = true;
+    clearInterval(updateInterval);
+    if (rideStream) rideStream.close();
+    setTimeout(() => {
+        // The report page streams the summary in once the ride has ended
+        const ended = endRide
+            ? fetch(`/api/end-ride/${rideId}`, {method: 'POST'}).catch(() => null)
+            : Promise.resolve();
+        ended.then(() => {
+            window.location.href = `/safety-report/${rideId}`;
+        });
+    }, 2000);
+}
+
 function updateRideStatus() {
-    fetch(`/api/ride-status/${rideId}`)
-        .then(res => res.json())
-        .then(data => {
-            // Update progress
-            document.getElementById('progressBar').style.width = data.progress + '%';
-            document.getElementById('elapsedTime').textContent = Math.round(data.elapsed_minutes);
-            
-            // Update safety events
-            if (data.safety_events.length > 0) {
-                const eventsHtml = data.safety_events.map(event => {
-                    const eventClass = event.level === 'DISTRESS' ? 'distress' : '';
-                    const time = new Date(event.timestamp).toLocaleTimeString();
-                    return `
-                        <div class="safety-event ${eventClass}">
-                            <strong>${event.type}</strong> - ${time}
-                            <p style="font-size: 14px; margin-top: 4px;">${event.details || ''}</p>
-                        </div>
-                    `;
-                }).join('');
-                document.getElementById('safetyEvents').innerHTML = eventsHtml;
-            }
-            
-            // Check if ride completed
-            if (data.progress >= 100) {
-                clearInterval(updateInterval);
-                setTimeout(() => {
-                    fetch(`/api/end-ride/${rideId}`, {method: 'POST'})
-                        .then(res => res.json())
-                        .then(data => {
-                            if (data.status === 'COMPLETED') {
-                                window.location.href = `/safety-report/${rideId}`;
-                            }
-                        });
-                }, 2000);
+    // A live stream already delivers every change
+    if (rideStream || rideFinished) return;
+    fetch(`/api/ride-status/${rideId}?since=${lastSeq}`)
+        .then(res => {
+            if (res.status === 404) {
+                // Ended elsewhere; the report page picks it up from here
+                finishRide(false);
+                return null;
             }
+            return res.json();
+        })
+        .then(data => {
+            if (data) applyRideStatus(data);
         });
 }
 
+function startPolling() {
+    if (updateInterval) return;
+    updateInterval = setInterval(updateRideStatus, 3000);
+    updateRideStatus();
+}
+
+function followRideStatus() {
+    if (!window.EventSource) {
+        startPolling();
+        return;
+    }
+    
+    // Pushed updates: a snapshot, then only what changes
+    rideStream = new EventSource(`/api/ride-status/${rideId}?stream=1`);
+    rideStream.addEventListener('snapshot', e => applyRideStatus(JSON.parse(e.data)));
+    rideStream.addEventListener('progress', e => renderProgress(JSON.parse(e.data)));
+    rideStream.addEventListener('safety_event', e => addSafetyEvents([JSON.parse(e.data)]));
+    rideStream.addEventListener('status', e => {
+        if (JSON.parse(e.data).status === 'COMPLETED') finishRide(false);
+    });
+    rideStream.onerror = () => {
+        if (rideFinished) return;
+        // Fall back to polling if the stream can't be (re)established
+        rideStream.close();
+        rideStream = null;
+        startPolling();
+    };
+}
+
 function showEmergencyOptions() {
     document.getElementById('emergencySheet').classList.add('active');
 }
@@ -1906,8 +2616,7 @@ function triggerEmergency(action) {
 
 // Initialize
 initVoiceRecognition();
-updateInterval = setInterval(updateRideStatus, 3000);
-updateRideStatus();
+followRideStatus();
 
 // Periodic AI check-ins
 setInterval(() => {
@@ -1935,30 +2644,30 @@ setInterval(() => {
         <h3 style="margin-bottom: 20px;">📊 AI Safety Analysis</h3>
         
         <div style="text-align: center; margin-bottom: 24px;">
-            <div style="font-size: 48px; color: #00AA13; font-weight: bold;">
-                {{ (report.overall_safety_score * 100)|int }}%
+            <div id="overallScore" style="font-size: 48px; color: #00AA13; font-weight: bold;">
+                {% if report.overall_safety_score is defined %}{{ (report.overall_safety_score * 100)|int }}%{% else %}--{% endif %}
             </div>
             <p style="color: #666;">Overall Safety Score</p>
         </div>
         
         <div style="display: grid; grid-template-columns: 1fr 1fr; gap: 12px;">
             <div style="text-align: center; padding: 16px; background: #f5f5f5; border-radius: 8px;">
-                <h4 style="font-size: 24px; color: #333;">{{ report.duration }}</h4>
+                <h4 id="reportDuration" style="font-size: 24px; color: #333;">{{ report.duration }}</h4>
                 <p style="color: #666; font-size: 14px;">Duration</p>
             </div>
             
             <div style="text-align: center; padding: 16px; background: #f5f5f5; border-radius: 8px;">
-                <h4 style="font-size: 24px; color: #333;">{{ report.incidents }}</h4>
+                <h4 id="reportIncidents" style="font-size: 24px; color: #333;">{{ report.incidents }}</h4>
                 <p style="color: #666; font-size: 14px;">Safety Events</p>
             </div>
             
             <div style="text-align: center; padding: 16px; background: #f5f5f5; border-radius: 8px;">
-                <h4 style="font-size: 24px; color: #333;">{{ report.route_compliance }}</h4>
+                <h4 id="reportCompliance" style="font-size: 24px; color: #333;">{{ report.route_compliance }}</h4>
                 <p style="color: #666; font-size: 14px;">Route Compliance</p>
             </div>
             
             <div style="text-align: center; padding: 16px; background: #f5f5f5; border-radius: 8px;">
-                <h4 style="font-size: 24px; color: #333;">{{ report.ai_interventions }}</h4>
+                <h4 id="reportInterventions" style="font-size: 24px; color: #333;">{{ report.ai_interventions }}</h4>
                 <p style="color: #666; font-size: 14px;">AI Check-ins</p>
             </div>
             
@@ -1968,17 +2677,19 @@ setInterval(() => {
 
     <div class="card">
         <h4 style="margin-bottom: 16px;">🎯 AI Recommendations</h4>
+        <div id="recommendations">
         {% for rec in report.recommendations %}
         <div style="padding: 12px; background: #E3F2FD; border-radius: 8px; margin-bottom: 8px;">
             <p style="color: #1976D2;">• {{ rec }}</p>
         </div>
         {% endfor %}
+        </div>
     </div>
     
     <div class="card">
         <h4 style="margin-bottom: 16px;">🎯 AI Summarization</h4>
         <div style="padding: 12px; background: #E3F2FD; border-radius: 8px; margin-bottom: 8px;">
-            <p style="color: #1976D2;">• {{ report.qwen_response }}</p>
+            <p style="color: #1976D2;">• <span id="qwenSummary">{{ report.qwen_response }}</span></p>
         </div>
     </div>
 
@@ -1990,7 +2701,7 @@ setInterval(() => {
         </p>
         
         <div style="margin-top: 16px;">
-            <button id="downloadBtn" data-ride-id="{{ report.ride_id }}" class="btn btn-secondary" style="font-size: 14px; padding: 10px 16px;">
+            <button id="downloadBtn" data-ride-id="{{ report.ride_id }}" class="btn btn-secondary" style="font-size: 14px; padding: 10px 16px;"{% if report.pending %} disabled{% endif %}>
                 Download Report
             </button>
         </div>
@@ -2014,6 +2725,108 @@ document.getElementById("downloadBtn").addEventListener("click", () => {
     link.click();
     link.remove();
 });
+
+function setScore(score) {
+    document.getElementById('overallScore').textContent = `${Math.floor(score * 100)}%`;
+}
+
+function renderReport(report) {
+    if (report.overall_safety_score !== undefined) {
+        setScore(report.overall_safety_score);
+    }
+    document.getElementById('reportDuration').textContent = report.duration ?? '';
+    document.getElementById('reportIncidents').textContent = report.incidents ?? '';
+    document.getElementById('reportCompliance').textContent = report.route_compliance ?? '';
+    document.getElementById('reportInterventions').textContent = report.ai_interventions ?? '';
+
+    const recommendations = document.getElementById('recommendations');
+    recommendations.innerHTML = '';
+    (report.recommendations || []).forEach(rec => {
+        const item = document.createElement('div');
+        item.style.cssText = 'padding: 12px; background: #E3F2FD; border-radius: 8px; margin-bottom: 8px;';
+        const text = document.createElement('p');
+        text.style.color = '#1976D2';
+        text.textContent = `• ${rec}`;
+        item.appendChild(text);
+        recommendations.appendChild(item);
+    });
+
+    if (report.qwen_response !== undefined) {
+        document.getElementById('qwenSummary').textContent = report.qwen_response;
+    }
+    document.getElementById('downloadBtn').disabled = false;
+}
+
+function pollReport() {
+    // Fallback when the push channel is unavailable
+    fetch(`/api/report-status/${rideId}`)
+        .then(res => res.json())
+        .then(data => {
+            if (data.ready) {
+                window.location.reload();
+            } else if (data.status === 'FAILED') {
+                document.getElementById('qwenSummary').textContent = 'We could not generate your safety summary. Please try again later.';
+            } else {
+                setTimeout(pollReport, 2000);
+            }
+        })
+        .catch(() => setTimeout(pollReport, 2000));
+}
+
+function followReport() {
+    // Renders the AI summary token by token while the report job runs
+    const summary = document.getElementById('qwenSummary');
+    const source = new EventSource(`/api/report-status/${rideId}?stream=1`);
+
+    source.addEventListener('token', e => {
+        summary.textContent += JSON.parse(e.data).text;
+    });
+    source.addEventListener('score', e => {
+        setScore(JSON.parse(e.data).overall_safety_score);
+    });
+    source.addEventListener('retry', () => {
+        summary.textContent = '';
+    });
+    source.addEventListener('report', e => {
+        source.close();
+        renderReport(JSON.parse(e.data));
+    });
+    source.addEventListener('failed', () => {
+        source.close();
+        summary.textContent = 'We could not generate your safety summary. Please try again later.';
+    });
+    source.onerror = () => {
+        if (source.readyState === EventSource.CLOSED) {
+            pollReport();
+        }
+    };
+}
+
+function waitForRideEnd() {
+    // The report job only exists once the ride is ended from the ride monitor
+    fetch(`/api/report-status/${rideId}`)
+        .then(res => {
+            if (res.ok) {
+                followReport();
+            } else {
+                setTimeout(waitForRideEnd, 3000);
+            }
+        })
+        .catch(() => setTimeout(waitForRideEnd, 3000));
+}
+
+function startReport(rideActive) {
+    if (!rideActive) {
+        followReport();
+        return;
+    }
+    document.getElementById('qwenSummary').textContent = 'Your ride is still in progress. Your safety summary will appear here once it ends.';
+    waitForRideEnd();
+}
+
+{% if report.pending %}
+startReport({{ 'true' if report.ride_active else 'false' }});
+{% endif %}
 </script>
 {% endblock %}'''
     
@@ -0,0 +1,148 @@
+"""
+ID Generation for GoGuard
+Monotonic, time-sortable, node-aware ids for rides, alerts and jobs
+"""
+
+import os
+import socket
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from typing import Optional, Tuple
+
+# Crockford base32: no I, L, O, U; ASCII order matches numeric order
+ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+_DECODE = {char: value for value, char in enumerate(ALPHABET)}
+# Two characters (10 bits) per lookup
+_PAIRS = [a + b for a in ALPHABET for b in ALPHABET]
+
+TIMESTAMP_BITS = 48  # milliseconds since the Unix epoch, good until the year 10889
+NODE_BITS = 16
+SEQUENCE_BITS = 16
+ID_BITS = TIMESTAMP_BITS + NODE_BITS + SEQUENCE_BITS
+ID_CHARS = ID_BITS // 5  # 16 characters
+
+MAX_NODE = (1 << NODE_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+
+def encode(value: int, chars: int = ID_CHARS) -> str:
+    """Fixed-width base32 of ``value``; ``chars`` must be even"""
+    pairs = []
+    for _ in range(chars // 2):
+        pairs.append(_PAIRS[value & 1023])
+        value >>= 10
+    return ''.join(reversed(pairs))
+
+
+def decode(text: str) -> int:
+    value = 0
+    for char in text.upper():
+        value = (value << 5) | _DECODE[char]
+    return value
+
+
+class IdGenerator:
+    """Snowflake-style ids: 48-bit ms timestamp | 16-bit node | 16-bit sequence.
+
+    Ids are fixed-width Crockford base32 after a prefix (``RIDE_01JA...``),
+    so sorting them as strings sorts them by creation time. Within one
+    node they are strictly increasing: the sequence allows 65,536 ids per
+    millisecond, after which the generator borrows the next millisecond,
+    and a clock that steps backwards never makes ids go backwards. Nodes
+    never coordinate; distinct node ids keep their ids disjoint.
+
+    The node id comes from GOGUARD_NODE_ID (0-65535) when set; otherwise it
+    is derived from the host name and process id, and re-derived after a
+    fork so worker processes don't share one. Derived ids are a 16-bit hash
+    and can collide, so processes writing to one shared store should each
+    be given their own GOGUARD_NODE_ID.
+    """
+
+    def __init__(self, node_id: Optional[int] = None):
+        if node_id is not None and not 0 <= node_id <= MAX_NODE:
+            raise ValueError(f"node_id must be between 0 and {MAX_NODE}")
+        self._configured_node = node_id
+        self._lock = threading.Lock()
+        self._head = (-1, '')
+        self._reset()
+
+    @classmethod
+    def from_env(cls) -> 'IdGenerator':
+        node_id = os.environ.get('GOGUARD_NODE_ID')
+        return cls(int(node_id) if node_id else None)
+
+    @property
+    def configured(self) -> bool:
+        """Whether the node id was given explicitly rather than derived"""
+        return self._configured_node is not None
+
+    def _reset(self):
+        self._pid = os.getpid()
+        if self._configured_node is not None:
+            self.node_id = self._configured_node
+        else:
+            self.node_id = zlib.crc32(f"{socket.gethostname()}:{self._pid}".encode()) & MAX_NODE
+        self._node_bits = self.node_id << SEQUENCE_BITS
+        self._last_ms = 0
+        self._sequence = 0
+
+    def next_int(self) -> int:
+        now_ms = time.time_ns() // 1_000_000
+        with self._lock:
+            if self._pid != os.getpid():
+                self._reset()
+            if now_ms > self._last_ms:
+                self._last_ms = now_ms
+                self._sequence = 0
+            elif self._sequence < MAX_SEQUENCE:
+                self._sequence += 1
+            else:
+                # Sequence exhausted (or clock went backwards): borrow the next ms
+                self._last_ms += 1
+                self._sequence = 0
+            return (self._last_ms << (NODE_BITS + SEQUENCE_BITS)) | self._node_bits | self._sequence
+
+    def new(self, prefix: str) -> str:
+        """A new id such as RIDE_06GMH4RWWW00E000"""
+        value = self.next_int()
+        # The leading 10 characters only change once per millisecond
+        high, head = self._head
+        if value >> 30 != high:
+            high = value >> 30
+            head = encode(high, 10)
+            self._head = (high, head)
+        return f"{prefix}_{head}{_PAIRS[(value >> 20) & 1023]}{_PAIRS[(value >> 10) & 1023]}{_PAIRS[value & 1023]}"
+
+
+def split(id_text: str) -> Tuple[str, int]:
+    """(prefix, numeric id) of a generated id"""
+    prefix, _, body = id_text.rpartition('_')
+    if len(body) != ID_CHARS:
+        raise ValueError(f"Not a generated id: {id_text}")
+    return prefix, decode(body)
+
+
+def timestamp_ms(id_text: str) -> int:
+    """Creation time of a generated id, in ms since the epoch"""
+    return split(id_text)[1] >> (NODE_BITS + SEQUENCE_BITS)
+
+
+def created_at(id_text: str) -> datetime:
+    return datetime.fromtimestamp(timestamp_ms(id_text) / 1000, tz=timezone.utc)
+
+
+def id_range(prefix: str, start_ms: int, end_ms: int) -> Tuple[str, str]:
+    """Smallest and largest possible ids created in [start_ms, end_ms]; compare as strings"""
+    low = start_ms << (NODE_BITS + SEQUENCE_BITS)
+    high = ((end_ms + 1) << (NODE_BITS + SEQUENCE_BITS)) - 1
+    return f"{prefix}_{encode(low)}", f"{prefix}_{encode(high)}"
+
+
+# Shared generator for every id goguard hands out
+id_generator = IdGenerator.from_env()
+
+
+def new_id(prefix: str) -> str:
+    return id_generator.new(prefix)
@@ -0,0 +1,177 @@
+"""
+Background Jobs for GoGuard
+Worker pool for slow work taken off the request path, with retry and backoff
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from ids import new_id
+
+PENDING = 'PENDING'
+RUNNING = 'RUNNING'
+RETRYING = 'RETRYING'
+DONE = 'DONE'
+FAILED = 'FAILED'
+
+
+class Job:
+    """One unit of background work and its progress events.
+
+    The job function receives the Job and may ``publish`` progress events
+    (e.g. streamed tokens); readers follow them with ``events_since``.
+    """
+
+    def __init__(self, job_id: str, key: Optional[str] = None):
+        self.id = job_id
+        self.key = key
+        self.status = PENDING
+        self.attempts = 0
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.updated_at = self.created_at
+        self.next_attempt_at: Optional[float] = None
+        self._events: List[Dict] = []
+        self._cond = threading.Condition()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (DONE, FAILED)
+
+    def publish(self, event: Dict):
+        with self._cond:
+            self._events.append(event)
+            self._cond.notify_all()
+
+    def events_since(self, cursor: int, timeout: float) -> Tuple[List[Dict], bool]:
+        """Events after ``cursor``, waiting up to ``timeout`` for new ones.
+
+        Returns (events, finished); once finished is True no more events follow.
+        """
+        with self._cond:
+            if len(self._events) <= cursor and not self.finished:
+                self._cond.wait(timeout)
+            return self._events[cursor:], self.finished
+
+    def _set_status(self, status: str, **fields):
+        with self._cond:
+            self.status = status
+            self.updated_at = time.time()
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self._cond.notify_all()
+
+    def to_dict(self) -> Dict:
+        return {
+            "job_id": self.id,
+            "key": self.key,
+            "status": self.status,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created_at": self.created_at,
+            "updated_at": self.updated_at,
+            "next_attempt_at": self.next_attempt_at,
+        }
+
+
+class JobQueue:
+    """Thread pool running jobs with exponential backoff between attempts.
+
+    A job function that raises is retried after ``backoff_base * 2**n``
+    seconds (with jitter, capped at ``backoff_max``) until ``max_attempts``
+    is reached; it then ends FAILED. Jobs can be looked up by id or by the
+    caller's ``key`` (e.g. a ride id). Only the newest ``max_finished``
+    finished jobs are kept.
+    """
+
+    def __init__(self, workers: int = 4, max_attempts: int = 3, backoff_base: float = 1.0,
+                 backoff_max: float = 30.0, max_finished: int = 1000, name: str = 'jobs'):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_finished = max_finished
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=name)
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._by_key: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+        self.retries = 0
+
+    def submit(self, fn: Callable[[Job], Any], key: Optional[str] = None) -> Job:
+        """Queue ``fn(job)``; its return value becomes ``job.result``"""
+        with self._lock:
+            job = Job(new_id("JOB"), key)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._by_key[key] = job.id
+            self.submitted += 1
+        self._executor.submit(self._run, job, fn)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def get_by_key(self, key: str) -> Optional[Job]:
+        with self._lock:
+            job_id = self._by_key.get(key)
+            return self._jobs.get(job_id) if job_id else None
+
+    def _run(self, job: Job, fn: Callable[[Job], Any]):
+        job.attempts += 1
+        job._set_status(RUNNING, next_attempt_at=None)
+        try:
+            result = fn(job)
+        except Exception as e:
+            print(f"Job {job.id} attempt {job.attempts} failed: {e!r}")
+            if job.attempts >= self.max_attempts:
+                job._set_status(FAILED, error=str(e))
+                with self._lock:
+                    self.failed += 1
+                self._prune()
+                return
+
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (job.attempts - 1))
+            delay *= random.uniform(0.8, 1.2)
+            job._set_status(RETRYING, error=str(e), next_attempt_at=time.time() + delay)
+            job.publish({"type": "retry", "attempt": job.attempts, "delay": round(delay, 2)})
+            with self._lock:
+                self.retries += 1
+            timer = threading.Timer(delay, self._executor.submit, args=(self._run, job, fn))
+            timer.daemon = True
+            timer.start()
+            return
+
+        job._set_status(DONE, result=result, error=None)
+        with self._lock:
+            self.succeeded += 1
+        self._prune()
+
+    def _prune(self):
+        with self._lock:
+            finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+            for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+                job = self._jobs.pop(job_id)
+                if job.key is not None and self._by_key.get(job.key) == job_id:
+                    del self._by_key[job.key]
+
+    def stats(self) -> Dict:
+        with self._lock:
+            active = sum(1 for job in self._jobs.values() if not job.finished)
+            return {
+                "submitted": self.submitted,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+                "retries": self.retries,
+                "active": active,
+                "tracked": len(self._jobs),
+                "max_attempts": self.max_attempts,
+            }
@@ -0,0 +1,197 @@
+"""
+Keyword Classification for GoGuard
+Compiles every safety lexicon into one regex and scans each text once
+"""
+
+import json
+import os
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set
+
+# Indonesian affixes tried around every term of a lexicon with
+# "morphology": "id", e.g. begal -> dibegal, pembegalan, begalnya
+ID_PREFIXES = ['di', 'ter', 'ke', 'se', 'ber', 'me', 'mem', 'men', 'meng', 'meny',
+               'pe', 'pem', 'pen', 'peng', 'peny', 'per']
+ID_SUFFIXES = ['kan', 'an', 'i', 'nya', 'lah', 'kah', 'pun']
+
+# label -> lexicon. Labels listed first win when two lexicons match the same text.
+DEFAULT_LEXICONS = {
+    'news_high': {
+        'terms': ['penculikan', 'pembunuhan', 'pemerkosaan', 'perampokan',
+                  'begal', 'tewas', 'meninggal', 'korban jiwa'],
+        'morphology': 'id',
+    },
+    'news_medium': {
+        'terms': ['kecelakaan', 'tabrakan', 'luka', 'terluka', 'pencurian',
+                  'copet', 'jambret', 'kriminal'],
+        'morphology': 'id',
+    },
+    'safe_word': {
+        'terms': ['komputer'],
+        'morphology': None,
+    },
+    'voice_distress': {
+        'terms': ['help', 'stop', 'wrong', 'scared', 'please', 'no', 'hurt',
+                  'tolong', 'tolongin', 'berhenti', 'takut', 'sakit', 'jangan',
+                  'lepasin', 'lepaskan', 'bahaya', 'ampun'],
+        'morphology': None,
+    },
+    'voice_concern': {
+        'terms': ['uncomfortable', 'weird', 'strange', 'lost', 'where',
+                  'aneh', 'nyasar', 'kemana', 'ke mana', 'salah jalan', 'bingung',
+                  'ga nyaman', 'gak nyaman', 'tidak nyaman'],
+        'morphology': None,
+    },
+}
+
+# Canned responses of the local distress classifier, by level
+DISTRESS_RESPONSES = {
+    'DISTRESS': {
+        "confidence": 0.9,
+        "ai_response": "I've detected you might be in distress. Would you like me to contact emergency services?",
+        "actions": ["contact_emergency", "share_location", "silent_alarm"],
+    },
+    'CONCERN': {
+        "confidence": 0.7,
+        "ai_response": "I noticed you might be uncomfortable. How can I help you feel safer?",
+        "actions": ["share_location", "call_support"],
+    },
+    'NORMAL': {
+        "confidence": 0.8,
+        "ai_response": "Your ride is progressing smoothly. I'm here if you need anything!",
+        "actions": [],
+    },
+}
+
+
+def _trie_regex(words: Iterable[str]) -> str:
+    """Alternation of words factored by common prefix, so the regex engine
+    never retries the same characters for every term"""
+    trie: Dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node: Dict) -> str:
+        ends_here = '' in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        if ends_here:
+            return '(?:' + body + ')?'
+        return body
+
+    return build(trie)
+
+
+class KeywordClassifier:
+    """Scans a text once against every lexicon.
+
+    All lexicons are compiled into one case-insensitive regex: each lexicon is
+    a prefix-factored alternation of its terms, wrapped in word boundaries and
+    (optionally) Indonesian affix variants. ``scan`` returns, per label, the
+    distinct lexicon terms found. ``reload`` recompiles and swaps the pattern
+    atomically, so lexicons can change without restarting.
+    """
+
+    def __init__(self, lexicons: Optional[Dict[str, Dict]] = None):
+        self._lock = threading.Lock()
+        self._compiled = None
+        self.reload(lexicons)
+
+    @classmethod
+    def from_env(cls) -> 'KeywordClassifier':
+        """Load GOGUARD_LEXICON_FILE when set, else the built-in lexicons"""
+        path = os.environ.get('GOGUARD_LEXICON_FILE')
+        classifier = cls()
+        if path:
+            classifier.load_file(path)
+        return classifier
+
+    def load_file(self, path: str):
+        """Replace the lexicons with the ones in a JSON file"""
+        with open(path, encoding='utf-8') as f:
+            self.reload(json.load(f))
+
+    def reload(self, lexicons: Optional[Dict[str, Dict]] = None):
+        """Compile new lexicons (defaults when None) and start using them"""
+        lexicons = DEFAULT_LEXICONS if lexicons is None else lexicons
+
+        parts = []
+        core_groups = {}
+        for index, (label, lexicon) in enumerate(lexicons.items()):
+            terms = sorted({term.lower() for term in lexicon.get('terms', []) if term})
+            if not terms:
+                continue
+
+            core = _trie_regex(terms)
+            prefix = suffix = ''
+            if lexicon.get('morphology') == 'id':
+                prefix = '(?:' + '|'.join(sorted(ID_PREFIXES, key=len, reverse=True)) + ')?'
+                suffix = '(?:' + '|'.join(sorted(ID_SUFFIXES, key=len, reverse=True)) + '){0,2}'
+
+            if lexicon.get('word_boundary', True):
+                pattern = rf'(?<!\w){prefix}(?P<c{index}>{core}){suffix}(?!\w)'
+            else:
+                pattern = rf'(?P<c{index}>{core})'
+            parts.append(pattern)
+            core_groups[f'c{index}'] = label
+
+        compiled = re.compile('|'.join(parts), re.IGNORECASE) if parts else None
+        with self._lock:
+            self._compiled = (compiled, core_groups, list(lexicons))
+            self.lexicons = lexicons
+
+    @property
+    def labels(self) -> List[str]:
+        return self._compiled[2]
+
+    def scan(self, text: str) -> Dict[str, Set[str]]:
+        """Distinct matched terms per label; unknown labels read as empty sets"""
+        compiled, core_groups, labels = self._compiled
+        found: Dict[str, Set[str]] = defaultdict(set, {label: set() for label in labels})
+        if compiled is None or not text:
+            return found
+
+        for match in compiled.finditer(text):
+            # Only one lexicon's term group takes part in each match
+            group = match.lastgroup
+            found[core_groups[group]].add(match.group(group).lower())
+        return found
+
+    def counts(self, text: str) -> Dict[str, int]:
+        return {label: len(terms) for label, terms in self.scan(text).items()}
+
+
+# Shared instance used by news severity and voice checks
+keyword_classifier = KeywordClassifier.from_env()
+
+
+def classify_distress(text: str, classifier: Optional[KeywordClassifier] = None) -> Dict:
+    """Deterministic on-box voice distress check (one regex scan, no I/O).
+
+    Two distinct distress terms mean DISTRESS; one distress term or two
+    concern terms mean CONCERN. A safe word sets ``is_safe_triggered``.
+    """
+    matches = (classifier or keyword_classifier).scan(text)
+    distress_count = len(matches['voice_distress'])
+    concern_count = len(matches['voice_concern'])
+
+    if distress_count >= 2:
+        level = 'DISTRESS'
+    elif distress_count >= 1 or concern_count >= 2:
+        level = 'CONCERN'
+    else:
+        level = 'NORMAL'
+
+    result = {"distress_level": level}
+    result.update(DISTRESS_RESPONSES[level])
+    result["actions"] = list(result["actions"])
+    result["is_safe_triggered"] = bool(matches['safe_word'])
+    result["source"] = "keywords"
+    return result
@@ -4,307 +4,324 @@ Handles all AI-powered safety analysis and responses
 """
 
 import os
+import random
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
 from openai import OpenAI
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple
 import json
 from datetime import datetime
 import re
+from keyword_matcher import classify_distress, keyword_classifier
+
+QWEN_API_KEY = "sk-82c126223773468ea3689259cb7047a8"
+# Point at a local OpenAI-compatible stub for testing
+DASHSCOPE_BASE_URL = os.environ.get('DASHSCOPE_BASE_URL', "https://dashscope-intl.aliyuncs.com/compatible-mode/v1")
+QWEN_MODEL = "qwen-plus"
+QWEN_TIMEOUT = float(os.environ.get('GOGUARD_QWEN_TIMEOUT', 20))  # seconds per call, including queueing
+QWEN_MAX_CONCURRENCY = int(os.environ.get('GOGUARD_QWEN_MAX_CONCURRENCY', 32))  # in-flight calls per client
+# Budget for the LLM to refine the local voice classification; 0 disables refinement
+VOICE_LLM_DEADLINE = float(os.environ.get('GOGUARD_VOICE_LLM_DEADLINE', 3.0))
+# Voice checks from concurrent rides are sent to the LLM together
+VOICE_BATCH_MAX_WAIT = float(os.environ.get('GOGUARD_VOICE_BATCH_MAX_WAIT_MS', 100)) / 1000
+VOICE_BATCH_MAX_SIZE = int(os.environ.get('GOGUARD_VOICE_BATCH_MAX_SIZE', 32))
+# Checks waiting for a batch beyond this get the keyword result straight away
+VOICE_BATCH_MAX_PENDING = int(os.environ.get('GOGUARD_VOICE_BATCH_MAX_PENDING', 256))
+SUMMARY_SCORE_PATTERN = re.compile(r'Overall Safety Score\s+(\d+)%', re.IGNORECASE)
+
+
+class QwenUnavailable(Exception):
+    """No LLM slot became free before the call deadline"""
+
+
 class QwenSafetyAI:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, base_url: str = None,
+                 timeout: float = QWEN_TIMEOUT, max_concurrency: int = QWEN_MAX_CONCURRENCY):
         """Initialize Qwen AI client"""
         self.client = OpenAI(
-            api_key=api_key or "sk-82c126223773468ea3689259cb7047a8",
-            base_url="https://dashscope-intl.aliyuncs.com/compatible-mode/v1",
+            api_key=api_key or QWEN_API_KEY,
+            base_url=base_url or DASHSCOPE_BASE_URL,
+            timeout=timeout,
+            max_retries=0,
         )
-        
+        self.timeout = timeout
+        # Bounds in-flight calls so a slow endpoint can't hold every worker thread
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+
         # TODO: Make it rotate API keys when run out optional
-        
-    def analyze_ride_safety(self, ride_data: Dict) -> Dict:
-        """Analyze ride safety using Qwen AI"""
-        try:
-            prompt = f"""
+
+    def _ride_safety_messages(self, ride_data: Dict) -> List[Dict]:
+        prompt = f"""
             As a safety AI assistant, analyze this ride data and provide a safety assessment:
-            
+
             Driver: {ride_data.get('driver_name')} (Rating: {ride_data.get('driver_rating')}, Rides: {ride_data.get('driver_rides')})
             Time: {ride_data.get('time')}
             Pickup: {ride_data.get('pickup')}
             Dropoff: {ride_data.get('dropoff')}
-            
+
             Provide:
             1. Overall safety score (0-1)
             2. Risk level (LOW/MEDIUM/HIGH)
             3. Key safety factors
             4. Recommendations
-            
+
             Format as JSON.
             """
-            
-            completion = self.client.chat.completions.create(
-                model="qwen-plus",
-                messages=[
-                    {"role": "system", "content": "You are GoGuard, an AI safety assistant for ride-sharing. Provide concise, actionable safety assessments."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7
-            )
-            
-            response = completion.choices[0].message.content
-            # Parse JSON response
-            try:
-                return json.loads(response)
-            except:
-                # Fallback parsing if response isn't valid JSON
-                return {
-                    "safety_score": 0.85,
-                    "risk_level": "MEDIUM",
-                    "factors": ["Late night ride", "Residential area"],
-                    "recommendations": ["Share location with trusted contact", "Use Safe Route mode"]
-                }
-                
-        except Exception as e:
-            print(f"Qwen AI Error: {e}")
-            return self._get_fallback_analysis(ride_data)
-    
-    def analyze_voice_distress(self, transcript: str, context: Dict) -> Dict:
-        """Analyze voice transcript for distress signals"""
+        return [
+            {"role": "system", "content": "You are GoGuard, an AI safety assistant for ride-sharing. Provide concise, actionable safety assessments."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_ride_safety(self, response: str) -> Dict:
+        # Parse JSON response
         try:
-            safety_keywords = ['komputer']
+            return json.loads(response)
+        except:
+            # Fallback parsing if response isn't valid JSON
+            return {
+                "safety_score": 0.85,
+                "risk_level": "MEDIUM",
+                "factors": ["Late night ride", "Residential area"],
+                "recommendations": ["Share location with trusted contact", "Use Safe Route mode"],
+                "fallback": True
+            }
 
-            prompt = f"""
+    def _voice_distress_messages(self, transcript: str, context: Dict) -> List[Dict]:
+        safety_keywords = sorted(keyword_classifier.lexicons.get('safe_word', {}).get('terms', []))
+
+        prompt = f"""
             Analyze this passenger voice transcript for safety concerns:
-            
+
             Transcript: "{transcript}"
             Safe keywords: {safety_keywords}
             Current location: {context.get('location', 'Unknown')}
             Ride duration: {context.get('duration', 'Unknown')} minutes
-            
+
             Determine:
             1. Distress level: NORMAL/CONCERN/DISTRESS
             2. Confidence score (0-1)
             3. Recommended response
             4. Suggested actions
             5. One of the safety keyword exist in the transcript either in a sentence or a standalone word. if mentioned, please flag it as triggered. Even is the sentence seems safe, if it contains one of the word you need to flag it.
-            
+
             Be sensitive to subtle signs of discomfort. Format as JSON with variables "distress_level", "confidence", "recommended_response", "suggested_actions", "is_safe_triggered".
             The possible suggested_actions are: ["contact_emergency", "share_location", "silent_alarm", "call_support"].
             JUST WRITE THE JSON STRING WITHOUT ANYTHING ELSE BECAUSE YOUR OUTPUT WILL BE PARSED DIRECTLY!
             """
-            
-            completion = self.client.chat.completions.create(
-                model="qwen-plus",
-                messages=[
-                    {"role": "system", "content": "You are a safety AI analyzing passenger voice for distress. Be highly sensitive to any signs of discomfort or danger."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.3
-            )
-            
-            response = completion.choices[0].message.content
-            
-            keyword_triggered = any(
-                keyword.lower() in transcript.lower() for keyword in safety_keywords
-            )
-            
-            print("analyze_voice_distress", transcript, response)
-            try:
-                result = json.loads(response)
-                return {
-                    "distress_level": result.get("distress_level", "NORMAL"),
-                    "confidence": result.get("confidence", 0.8),
-                    "ai_response": result.get("recommended_response", "I'm here if you need anything. Everything okay?"),
-                    "actions": result.get("suggested_actions", []),
-                    "is_safe_triggered": result.get("is_safe_triggered", False) or keyword_triggered
-                }
-            except:
-                # Fallback to keyword-based analysis
-                return self._analyze_keywords(transcript)
-                
-        except Exception as e:
-            print(f"Voice analysis error: {e}")
-            return self._analyze_keywords(transcript)
-    
-    def generate_safety_checkin(self, ride_context: Dict) -> str:
-        """Generate contextual safety check-in message"""
+        return [
+            {"role": "system", "content": "You are a safety AI analyzing passenger voice for distress. Be highly sensitive to any signs of discomfort or danger."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_voice_distress(self, response: str, transcript: str) -> Dict:
+        """Raises ValueError when the model did not answer with JSON"""
+        print("analyze_voice_distress", transcript, response)
+        return self._voice_result(json.loads(response), transcript)
+
+    def _voice_result(self, result: Dict, transcript: str) -> Dict:
+        keyword_triggered = bool(keyword_classifier.scan(transcript)['safe_word'])
+        return {
+            "distress_level": result.get("distress_level", "NORMAL"),
+            "confidence": result.get("confidence", 0.8),
+            "ai_response": result.get("recommended_response", "I'm here if you need anything. Everything okay?"),
+            "actions": result.get("suggested_actions", []),
+            "is_safe_triggered": result.get("is_safe_triggered", False) or keyword_triggered
+        }
+
+    def _refine_voice_distress(self, local: Dict, response: str, transcript: str) -> Dict:
+        """Prefer the LLM's reading, but never lose a safe word the keywords caught"""
+        try:
+            refined = self._parse_voice_distress(response, transcript)
+        except (ValueError, AttributeError):
+            return local
+        return self._merge_voice_distress(local, refined)
+
+    def _merge_voice_distress(self, local: Dict, refined: Dict) -> Dict:
+        refined["is_safe_triggered"] = refined["is_safe_triggered"] or local["is_safe_triggered"]
+        refined["source"] = "llm"
+        return refined
+
+    def _voice_batch_messages(self, items: List[Tuple[str, Dict]]) -> List[Dict]:
+        safety_keywords = sorted(keyword_classifier.lexicons.get('safe_word', {}).get('terms', []))
+        rides = "\n".join(
+            json.dumps({
+                "id": index,
+                "transcript": transcript,
+                "location": context.get('location', 'Unknown'),
+                "duration_minutes": context.get('duration', 'Unknown'),
+            }, ensure_ascii=False)
+            for index, (transcript, context) in enumerate(items)
+        )
+
+        prompt = f"""
+            Analyze these passenger voice transcripts for safety concerns. Each line is a separate ride:
+
+            {rides}
+
+            Safe keywords: {safety_keywords}
+
+            For every ride determine:
+            1. Distress level: NORMAL/CONCERN/DISTRESS
+            2. Confidence score (0-1)
+            3. Recommended response
+            4. Suggested actions
+            5. One of the safety keyword exist in the transcript either in a sentence or a standalone word. if mentioned, please flag it as triggered. Even is the sentence seems safe, if it contains one of the word you need to flag it.
+
+            Be sensitive to subtle signs of discomfort. Judge every ride only by its own transcript.
+            Format as a JSON array with one object per ride, each with variables "id", "distress_level", "confidence", "recommended_response", "suggested_actions", "is_safe_triggered".
+            The possible suggested_actions are: ["contact_emergency", "share_location", "silent_alarm", "call_support"].
+            JUST WRITE THE JSON ARRAY WITHOUT ANYTHING ELSE BECAUSE YOUR OUTPUT WILL BE PARSED DIRECTLY!
+            """
+        return [
+            {"role": "system", "content": "You are a safety AI analyzing passenger voice for distress. Be highly sensitive to any signs of discomfort or danger."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_voice_batch(self, response: str, items: List[Tuple[str, Dict]]) -> List[Optional[Dict]]:
+        """Per-item results in input order; None where the model skipped an item"""
+        results = json.loads(response)
+        if isinstance(results, dict):
+            results = results.get("results", [])
+
+        by_id = {}
+        for result in results:
+            if isinstance(result, dict) and isinstance(result.get("id"), int):
+                by_id[result["id"]] = result
+        return [
+            self._voice_result(by_id[index], transcript) if index in by_id else None
+            for index, (transcript, _) in enumerate(items)
+        ]
+
+    def _merge_voice_batch(self, local_results: List[Dict], response: str,
+                           items: List[Tuple[str, Dict]]) -> List[Dict]:
         try:
-            prompt = f"""
+            refined = self._parse_voice_batch(response, items)
+        except (ValueError, AttributeError, TypeError):
+            return local_results
+        return [
+            local if result is None else self._merge_voice_distress(local, result)
+            for local, result in zip(local_results, refined)
+        ]
+
+    def _checkin_messages(self, ride_context: Dict) -> List[Dict]:
+        prompt = f"""
             Generate a natural, caring check-in message for a passenger.
             Context:
             - Ride progress: {ride_context.get('progress', 50)}%
             - Time: {ride_context.get('time', 'evening')}
             - Previous events: {ride_context.get('events', [])}
-            
+
             Make it brief, friendly, and non-alarming. Max 2 sentences.
             """
-            
-            completion = self.client.chat.completions.create(
-                model="qwen-plus",
-                messages=[
-                    {"role": "system", "content": "You are GoGuard, a friendly AI safety companion. Generate natural check-in messages."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.8
-            )
-            
-            return completion.choices[0].message.content.strip()
-            
-        except Exception as e:
-            # Fallback messages
-            messages = [
-                "Hi! Just checking in. How's your ride going?",
-                "Everything going smoothly? I'm here if you need anything!",
-                "Hope you're having a comfortable ride. Let me know if you need help!"
-            ]
-            import random
-            return random.choice(messages)
-    
-    
-    def summarize_ride_safety(self, ride_data: Dict) -> Dict:
-        """Generate post-ride safety summary"""
-        try:
-            prompt = f"""
+        return [
+            {"role": "system", "content": "You are GoGuard, a friendly AI safety companion. Generate natural check-in messages."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _fallback_checkin(self) -> str:
+        # Fallback messages
+        messages = [
+            "Hi! Just checking in. How's your ride going?",
+            "Everything going smoothly? I'm here if you need anything!",
+            "Hope you're having a comfortable ride. Let me know if you need help!"
+        ]
+        return random.choice(messages)
+
+    def _summary_messages(self, ride_data: Dict) -> List[Dict]:
+        prompt = f"""
             Summarize this ride from a safety perspective:
-            
+
             Duration: {ride_data.get('duration', 'Unknown')}
             Route: {ride_data.get('route_type', 'standard')}
             Safety events: {ride_data.get('events', [])}
             Is safety keyword triggered: {ride_data.get("is_safe_triggered", False)}
-            
+
             Provide:
             1. Overall safety score (0-100)
             2. Key safety highlights
             3. Recommendations for future rides
             4. Areas of concern (if any)
-            
+
             Format as a paragraph with bullet points, do not bold any text with **.
             If the safety keyword is triggered, that means the user is in danger and the ride has been flagged by the system.
             Mention the safety score in this format: Overall Safety Score X%.
             """
-            
-            completion = self.client.chat.completions.create(
-                model="qwen-plus",
-                messages=[
-                    {"role": "system", "content": "You are a safety analyst. Provide constructive, actionable safety summaries."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.6
-            )
-            
-            response = completion.choices[0].message.content        
-            
-            try:
-                summary = json.loads(response)
-                summary["duration"] = ride_data.get('duration', 'Unknown')
-                return summary
-            except Exception as e:
-                print(f"Exception: {e}")
-                
-                match = re.search(r'Overall Safety Score\s+(\d+)%', response, re.IGNORECASE)
-                if match:
-                    safety_score = int(match.group(1))
-                    print(f"Extracted safety score: {safety_score}")
-                    safety_score = safety_score / 100 
-                else:
-                    print("Safety % not detected from regex.")
-                    safety_score = 0.92
-                    
-                return {
-                    "duration": ride_data.get('duration', 'Unknown'),
-                    "safety_score": safety_score * 100,
-                    "highlights": ["Smooth ride", "No route deviations", "Professional driver"],
-                    "recommendations": ["Continue using Safe Route mode for late-night rides"],
-                    "concerns": [],
-                    "route_compliance": "98%",
-                    "driver_behavior": "Excellent",
-                    "ai_interventions": 1,
-                    "incidents": 0,
-                    "overall_safety_score": safety_score,
-                    'qwen_response': response
-                }
-                
+        return [
+            {"role": "system", "content": "You are a safety analyst. Provide constructive, actionable safety summaries."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_summary(self, response: str, ride_data: Dict) -> Dict:
+        try:
+            summary = json.loads(response)
+            summary["duration"] = ride_data.get('duration', 'Unknown')
+            return summary
         except Exception as e:
-            print(f"Summary generation error: {e}")
-            return self._get_default_summary(ride_data)
-        
-    
-    
-    def _analyze_keywords(self, transcript: str) -> Dict:
-        """Fallback keyword-based analysis"""
-        transcript_lower = transcript.lower()
-        
-        # TODO: Monitor this evaluation
-        
-        prompt = f"""
-        Summarize this voice transcription of our passenger.
-        Analyze and check for safety concerns
-    
-        {transcript_lower}
-        
-        And then rate from 
-            0.9 up: DISTRESS,
-            0.75 - 0.9: CONCERN
-            0.75 and below: NORMAL
-            
-        Only return the type "DISTRESS", "CONCERN", "NORMAL"
-        """
-        
-        completion = self.client.chat.completions.create(
-            model="qwen-plus",
-            messages=[
-                {"role": "system", "content": "You are a safety analyst. Provide constructive, actionable safety summaries."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.6
-        )
-        
-        completion_response = completion.choices[0].message.content
-        if completion_response:
-            if 'distress' in completion_response.lower():
-            
-                return {
-                    "distress_level": "DISTRESS",
-                    "confidence": 0.9,
-                    "ai_response": "I've detected you might be in distress. Would you like me to contact emergency services?",
-                    "actions": ["contact_emergency", "share_location", "silent_alarm"],
-                    "is_safe_triggered": False,
-                }
-            elif 'concern' in completion_response.lower():
-                
-                return {
-                    "distress_level": "CONCERN",
-                    "confidence": 0.7,
-                    "ai_response": "I noticed you might be uncomfortable. How can I help you feel safer?",
-                    "actions": ["share_location", "call_support"],
-                    "is_safe_triggered": False,
-                }
-            
+            print(f"Exception: {e}")
+
+            safety_score = self._score_from_text(response)
+            if safety_score is not None:
+                print(f"Extracted safety score: {safety_score * 100:.0f}")
             else:
-                
-                return {
-                    "distress_level": "NORMAL",
-                    "confidence": 0.8,
-                    "ai_response": "Your ride is progressing smoothly. I'm here if you need anything!",
-                    "actions": [],
-                    "is_safe_triggered": False,
-                }
-            
-            
-    
+                print("Safety % not detected from regex.")
+                safety_score = 0.92
+
+            return {
+                "duration": ride_data.get('duration', 'Unknown'),
+                "safety_score": safety_score * 100,
+                "highlights": ["Smooth ride", "No route deviations", "Professional driver"],
+                "recommendations": ["Continue using Safe Route mode for late-night rides"],
+                "concerns": [],
+                "route_compliance": "98%",
+                "driver_behavior": "Excellent",
+                "ai_interventions": 1,
+                "incidents": 0,
+                "overall_safety_score": safety_score,
+                'qwen_response': response
+            }
+
+    @staticmethod
+    def _score_from_text(text: str) -> Optional[float]:
+        """"Overall Safety Score X%" as a 0-1 fraction, None until the pattern is complete"""
+        match = SUMMARY_SCORE_PATTERN.search(text)
+        return int(match.group(1)) / 100 if match else None
+
+    def _stream_summary_events(self, tokens: Iterator[str]) -> Iterator[Dict]:
+        """Wrap summary tokens as events, adding a score event as soon as it appears"""
+        tail = ''
+        score = None
+        for token in tokens:
+            yield {"type": "token", "text": token}
+            if score is None:
+                # The pattern is short, so only the recent tail needs scanning
+                tail = (tail + token)[-64:]
+                score = self._score_from_text(tail)
+                if score is not None:
+                    yield {"type": "score", "overall_safety_score": score}
+
+    def _analyze_keywords(self, transcript: str) -> Dict:
+        """Local keyword-based analysis; deterministic and never leaves the box"""
+        return classify_distress(transcript)
+
     def _get_fallback_analysis(self, ride_data: Dict) -> Dict:
         """Fallback analysis when AI is unavailable"""
         hour = datetime.now().hour
         is_late_night = hour >= 22 or hour <= 5
-        
+
         base_score = 0.85
         if is_late_night:
             base_score -= 0.15
-            
+
         return {
             "safety_score": base_score,
             "risk_level": "HIGH" if base_score < 0.7 else "MEDIUM" if base_score < 0.85 else "LOW",
             "factors": ["Time of day", "Route distance"],
-            "recommendations": ["Enable Safe Route mode", "Share trip with trusted contact"]
+            "recommendations": ["Enable Safe Route mode", "Share trip with trusted contact"],
+            "fallback": True
         }
-    
+
     def _get_default_summary(self, ride_data: Dict) -> Dict:
         """Default summary when AI is unavailable"""
         return {
@@ -319,13 +336,299 @@ class QwenSafetyAI:
                 "Consider Safe Route mode for future late-night trips"
             ],
             "concerns": [],
-            'qwen_response': 'test'
+            "duration": ride_data.get('duration', 'Unknown'),
+            "overall_safety_score": 0.9,
+            'qwen_response': 'test',
+            "fallback": True
         }
 
+    def _complete(self, messages: List[Dict], temperature: float, timeout: Optional[float] = None) -> str:
+        """One chat completion under the concurrency limit and call deadline"""
+        timeout = timeout or self.timeout
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            raise QwenUnavailable(f"No free Qwen slot within {timeout}s")
+        try:
+            # Time spent waiting for a slot comes out of the same deadline
+            remaining = max(timeout - (time.monotonic() - started), 0.001)
+            completion = self.client.with_options(timeout=remaining).chat.completions.create(
+                model=QWEN_MODEL,
+                messages=messages,
+                temperature=temperature
+            )
+        finally:
+            self._slots.release()
+
+        return completion.choices[0].message.content
+
+    def _stream(self, messages: List[Dict], temperature: float, timeout: Optional[float] = None) -> Iterator[str]:
+        """Stream completion tokens; the slot is held until the stream ends or is closed"""
+        timeout = timeout or self.timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise QwenUnavailable(f"No free Qwen slot within {timeout}s")
+        stream = None
+        try:
+            stream = self.client.with_options(timeout=timeout).chat.completions.create(
+                model=QWEN_MODEL,
+                messages=messages,
+                temperature=temperature,
+                stream=True
+            )
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+        finally:
+            if stream is not None:
+                stream.close()
+            self._slots.release()
+
+    def analyze_ride_safety(self, ride_data: Dict) -> Dict:
+        """Analyze ride safety using Qwen AI"""
+        try:
+            response = self._complete(self._ride_safety_messages(ride_data), temperature=0.7)
+            return self._parse_ride_safety(response)
+
+        except Exception as e:
+            print(f"Qwen AI Error: {e}")
+            return self._get_fallback_analysis(ride_data)
+
+    def analyze_voice_distress(self, transcript: str, context: Dict, deadline: float = VOICE_LLM_DEADLINE) -> Dict:
+        """Analyze voice transcript for distress signals.
+
+        The local keyword result is always computed first; the LLM only
+        refines it within ``deadline`` seconds and is never retried.
+        """
+        local = self._analyze_keywords(transcript)
+        if deadline <= 0:
+            return local
+
+        try:
+            response = self._complete(self._voice_distress_messages(transcript, context), 0.3, deadline)
+            return self._refine_voice_distress(local, response, transcript)
+        except Exception as e:
+            print(f"Voice analysis error: {e!r}")
+            return local
+
+    def analyze_voice_distress_batch(self, items: List[Tuple[str, Dict]],
+                                     deadline: float = VOICE_LLM_DEADLINE) -> List[Dict]:
+        """Analyze (transcript, context) pairs from many rides in one LLM request.
+
+        Returns one result per item, in order. Items the model skipped, and
+        every item when the call fails, keep their local keyword result.
+        """
+        local_results = [self._analyze_keywords(transcript) for transcript, _ in items]
+        if deadline <= 0 or not items:
+            return local_results
+
+        try:
+            response = self._complete(self._voice_batch_messages(items), 0.3, deadline)
+        except Exception as e:
+            print(f"Voice batch analysis error: {e!r}")
+            return local_results
+        return self._merge_voice_batch(local_results, response, items)
+
+    def generate_safety_checkin(self, ride_context: Dict) -> str:
+        """Generate contextual safety check-in message"""
+        try:
+            response = self._complete(self._checkin_messages(ride_context), temperature=0.8)
+            return response.strip()
+
+        except Exception as e:
+            return self._fallback_checkin()
+
+    def summarize_ride_safety(self, ride_data: Dict) -> Dict:
+        """Generate post-ride safety summary"""
+        try:
+            response = self._complete(self._summary_messages(ride_data), temperature=0.6)
+            return self._parse_summary(response, ride_data)
+
+        except Exception as e:
+            print(f"Summary generation error: {e}")
+            return self._get_default_summary(ride_data)
+
+    def stream_safety_checkin(self, ride_context: Dict) -> Iterator[str]:
+        """Streaming generate_safety_checkin: yields message text as it arrives"""
+        sent = False
+        try:
+            for token in self._stream(self._checkin_messages(ride_context), temperature=0.8):
+                sent = True
+                yield token
+        except Exception as e:
+            print(f"Check-in stream error: {e!r}")
+            if not sent:
+                yield self._fallback_checkin()
+
+    def stream_ride_summary(self, ride_data: Dict) -> Iterator[Dict]:
+        """Streaming summarize_ride_safety.
+
+        Yields {"type": "token", "text"} events as the completion arrives, one
+        {"type": "score", "overall_safety_score"} event as soon as the score
+        line is complete, and finally {"type": "summary", "summary"} holding
+        the same dict summarize_ride_safety would return. A stream that breaks
+        off part way yields the partial summary marked ``"truncated": True``.
+        """
+        text = []
+        try:
+            for event in self._stream_summary_events(self._stream(self._summary_messages(ride_data), temperature=0.6)):
+                if event["type"] == "token":
+                    text.append(event["text"])
+                yield event
+        except Exception as e:
+            print(f"Summary stream error: {e!r}")
+            if not text:
+                yield {"type": "summary", "summary": self._get_default_summary(ride_data)}
+                return
+            yield {"type": "summary", "summary": {**self._parse_summary("".join(text), ride_data), "truncated": True}}
+            return
+
+        yield {"type": "summary", "summary": self._parse_summary("".join(text), ride_data)}
+
+
+class VoiceDistressBatcher:
+    """Micro-batches voice distress checks across concurrent rides.
+
+    The first transcript to arrive opens a window; the batch goes out as
+    one LLM request once ``max_wait`` seconds have passed or ``max_size``
+    transcripts are waiting, whichever comes first. Callers block in
+    ``analyze`` for at most ``deadline`` seconds and otherwise get the local
+    keyword result, so batching never makes a voice check slower than the
+    unbatched deadline.
+
+    A caller that gives up cancels its check, and checks past their
+    deadline are dropped before the LLM call, so nobody pays for answers
+    that can no longer be used. At most ``max_pending`` checks wait for a
+    batch; beyond that, new checks get the keyword result immediately.
+    """
+
+    def __init__(self, ai: QwenSafetyAI, max_wait: float = VOICE_BATCH_MAX_WAIT,
+                 max_size: int = VOICE_BATCH_MAX_SIZE, deadline: float = VOICE_LLM_DEADLINE,
+                 workers: int = 4, max_pending: int = VOICE_BATCH_MAX_PENDING):
+        self.ai = ai
+        self.max_wait = max_wait
+        self.max_size = max_size
+        self.deadline = deadline
+        self.max_pending = max_pending
+        # (transcript, context, future, monotonic deadline)
+        self._pending: List[Tuple[str, Dict, Future, float]] = []
+        # Checks submitted but not yet sent, including whole batches waiting for a worker
+        self._queued = 0
+        self._cond = threading.Condition()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='voice-batch')
+        self._thread = None
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+        self.caller_timeouts = 0
+        self.shed = 0
+        self.dropped = 0
+
+    def analyze(self, transcript: str, context: Dict) -> Dict:
+        """Drop-in for QwenSafetyAI.analyze_voice_distress"""
+        if self.deadline <= 0:
+            return self.ai._analyze_keywords(transcript)
+
+        future = self.submit(transcript, context)
+        try:
+            return future.result(timeout=self.deadline)
+        except FutureTimeout:
+            # Cancelled before its batch goes out, it is never sent
+            future.cancel()
+            with self._cond:
+                self.caller_timeouts += 1
+            return self.ai._analyze_keywords(transcript)
+
+    def submit(self, transcript: str, context: Dict) -> Future:
+        future = Future()
+        with self._cond:
+            if self._queued >= self.max_pending:
+                self.shed += 1
+                shed = True
+            else:
+                shed = False
+                if self._thread is None:
+                    # Started on first use so forked workers each get their own
+                    self._thread = threading.Thread(target=self._run, name='voice-batcher', daemon=True)
+                    self._thread.start()
+                self._pending.append((transcript, context, future, time.monotonic() + self.deadline))
+                self._queued += 1
+                self._cond.notify()
+        if shed:
+            future.set_result(self.ai._analyze_keywords(transcript))
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+
+                window_ends = time.monotonic() + self.max_wait
+                while len(self._pending) < self.max_size:
+                    remaining = window_ends - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+
+                batch = self._pending[:self.max_size]
+                del self._pending[:self.max_size]
+
+            # The LLM call runs off this thread so the next window opens immediately
+            self._executor.submit(self._dispatch, batch)
+
+    def _dispatch(self, batch: List[Tuple[str, Dict, Future, float]]):
+        # Drop checks whose caller gave up or whose deadline passed while queued;
+        # the rest are marked running so callers can no longer cancel them
+        now = time.monotonic()
+        live = []
+        for item in batch:
+            future, deadline_at = item[2], item[3]
+            if deadline_at <= now:
+                future.cancel()
+            if future.set_running_or_notify_cancel():
+                live.append(item)
+        with self._cond:
+            self._queued -= len(batch)
+            self.dropped += len(batch) - len(live)
+            if live:
+                self.batches += 1
+                self.items += len(live)
+                self.largest_batch = max(self.largest_batch, len(live))
+        if not live:
+            return
+
+        items = [(transcript, context) for transcript, context, _, _ in live]
+        # Answer within the most urgent caller's remaining time
+        budget = min(deadline_at for _, _, _, deadline_at in live) - now
+        try:
+            results = self.ai.analyze_voice_distress_batch(items, max(budget, 0.001))
+        except Exception as e:
+            print(f"Voice batch error: {e!r}")
+            results = [self.ai._analyze_keywords(transcript) for transcript, _ in items]
+
+        for (_, _, future, _), result in zip(live, results):
+            future.set_result(result)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "batches": self.batches,
+                "items": self.items,
+                "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+                "largest_batch": self.largest_batch,
+                "pending": self._queued,
+                "caller_timeouts": self.caller_timeouts,
+                "dropped": self.dropped,
+                "shed": self.shed,
+                "max_pending": self.max_pending,
+                "max_wait_ms": round(self.max_wait * 1000),
+                "max_size": self.max_size,
+            }
+
 # Example usage
 if __name__ == "__main__":
     ai = QwenSafetyAI()
-    
+
     # Test ride analysis
     ride_data = {
         "driver_name": "Ahmad Rizki",
@@ -335,10 +638,10 @@ if __name__ == "__main__":
         "pickup": "Mall Grand Indonesia",
         "dropoff": "Apartment Sudirman Park"
     }
-    
+
     print("Ride Safety Analysis:")
     print(json.dumps(ai.analyze_ride_safety(ride_data), indent=2))
-    
+
     # Test voice analysis
     # TODO: Fix voice analysis to not access text but voice.
     print("\nVoice Analysis:")
@@ -346,4 +649,4 @@ if __name__ == "__main__":
         "Aduh ga usah gapapa, lewat jalan biasa aja. jangan dibawa ke rute yang beda saya takut soalnya.. ",
         {"location": "Unknown street", "duration": 15}
     )
-    print(json.dumps(voice_result, indent=2))
\ No newline at end of file
+    print(json.dumps(voice_result, indent=2))
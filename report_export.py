@@ -0,0 +1,390 @@
+"""
+Report Export for GoGuard
+Bulk safety report PDF export, rendered in a process pool and streamed as a zip
+
+Usage: python report_export.py [--db goguard_rides.db] (--ride-id RIDE_... ... | --start 2026-10-01 [--end 2026-10-02])
+                               [--workers 4] [-o reports.zip]
+"""
+
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+import zipfile
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import partial
+from multiprocessing.connection import Connection
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from ids import TIMESTAMP_BITS, id_range
+from report_pdf import PDFCache, render_report_pdf, report_styles
+from ride_registry import SQLiteReportStore
+
+
+# Latest time an id can encode
+MAX_TIME_MS = (1 << TIMESTAMP_BITS) - 1
+
+
+def parse_time(value: Union[str, int, float]) -> int:
+    """Milliseconds since the epoch from epoch seconds or an ISO 8601 time (local unless it has an offset)"""
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(f"Not a time: {value!r}")
+    try:
+        seconds = float(value)
+    except OverflowError:
+        raise ValueError(f"Time out of range: {value!r}")
+    except ValueError:
+        try:
+            seconds = datetime.fromisoformat(value).timestamp()
+        except (ValueError, OverflowError, OSError):
+            raise ValueError(f"Not a time: {value!r}")
+    # inf, nan and times no id can hold would make a meaningless id range
+    if not math.isfinite(seconds) or not 0 <= seconds * 1000 <= MAX_TIME_MS:
+        raise ValueError(f"Time out of range: {value!r}")
+    return int(seconds * 1000)
+
+
+def select_ride_ids(store, ride_ids: Optional[List[str]] = None, start=None, end=None) -> List[str]:
+    """Ride ids to export: the given list, or every report of rides started in [start, end]"""
+    if ride_ids is not None and (not isinstance(ride_ids, list)
+                                 or not all(isinstance(ride_id, str) for ride_id in ride_ids)):
+        raise ValueError("ride_ids must be a list of ride ids")
+    if ride_ids:
+        # Keep the caller's order, once each
+        return list(dict.fromkeys(ride_ids))
+    if start is None and end is None:
+        raise ValueError("Give ride_ids or a start/end time range")
+
+    start_ms = 0 if start is None else parse_time(start)
+    end_ms = int(time.time() * 1000) if end is None else parse_time(end)
+    if end_ms < start_ms:
+        raise ValueError("end is before start")
+    return store.ids(*id_range('RIDE', start_ms, end_ms))
+
+
+class _ChunkSink:
+    """Write-only file zipfile streams into; the generator drains it after each entry"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _init_worker():
+    # Each worker builds its style sheet once and reuses it for every report
+    report_styles()
+
+
+def _failed(error: BaseException) -> Future:
+    future = Future()
+    future.set_exception(error)
+    return future
+
+
+def _serve(workers: int):
+    """Render helper main: runs requests from stdin in a process pool, replies on stdout"""
+    # The server ends the helper by closing its stdin
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Replies get their own copy of stdout; stray prints go to stderr
+    replies = Connection(os.dup(1), readable=False)
+    os.dup2(2, 1)
+    requests = Connection(0, writable=False)
+    send_lock = threading.Lock()
+
+    def reply(request_id: int, job: Future):
+        try:
+            message = (request_id, True, job.result())
+        except BaseException as e:
+            message = (request_id, False, e)
+        with send_lock:
+            try:
+                replies.send(message)
+            except OSError:
+                pass  # the server went away
+
+    # Workers fork from a server that already imported report_pdf, where supported
+    method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    context = multiprocessing.get_context(method)
+    if method == 'forkserver':
+        context.set_forkserver_preload(['report_pdf'])
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+        while True:
+            try:
+                request_id, fn, data = requests.recv()
+            except EOFError:
+                break
+            try:
+                pool.submit(fn, data).add_done_callback(partial(reply, request_id))
+            except BrokenProcessPool as e:
+                # Exiting tells the server to start a fresh helper
+                reply(request_id, _failed(e))
+                break
+
+
+class _RenderHelper:
+    """Process pool hosted by a helper process, with the Executor calls ReportExporter uses.
+
+    spawn and forkserver pool workers re-run the parent's main script before
+    their first task; for ``python goguard.py`` that would rebuild the whole
+    app in every worker. The helper is started with ``python -c``, so its
+    workers import only the report modules. ``fn`` must be importable by name.
+    """
+
+    def __init__(self, workers: int):
+        package_dir = os.path.dirname(os.path.abspath(__file__))
+        self._process = subprocess.Popen(
+            [sys.executable, '-c',
+             f"import sys; sys.path.insert(0, {package_dir!r}); import report_export; report_export._serve({workers})"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+        )
+        self._requests = Connection(os.dup(self._process.stdin.fileno()), readable=False)
+        self._replies = Connection(os.dup(self._process.stdout.fileno()), writable=False)
+        self._process.stdin.close()
+        self._process.stdout.close()
+        self._futures: Dict[int, Future] = {}
+        self._next_id = 0
+        self._broken: Optional[str] = None
+        self._lock = threading.Lock()
+        threading.Thread(target=self._read_replies, name='report-render', daemon=True).start()
+
+    def submit(self, fn, data) -> Future:
+        future = Future()
+        with self._lock:
+            if self._broken:
+                raise BrokenProcessPool(self._broken)
+            self._next_id += 1
+            self._futures[self._next_id] = future
+            try:
+                self._requests.send((self._next_id, fn, data))
+            except OSError as e:
+                del self._futures[self._next_id]
+                raise BrokenProcessPool(f"render helper exited: {e!r}")
+        return future
+
+    def _read_replies(self):
+        while True:
+            try:
+                request_id, ok, value = self._replies.recv()
+            except (EOFError, OSError):
+                break
+            with self._lock:
+                future = self._futures.pop(request_id, None)
+            if future is None:
+                continue  # cancelled
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+        with self._lock:
+            self._broken = self._broken or "render helper exited"
+            futures, self._futures = self._futures, {}
+        for future in futures.values():
+            future.set_exception(BrokenProcessPool(self._broken))
+
+    def shutdown(self, wait: bool = True, cancel_futures: bool = False):
+        with self._lock:
+            self._broken = self._broken or "render helper shut down"
+            cancelled = list(self._futures.values()) if cancel_futures else []
+            if cancel_futures:
+                self._futures.clear()
+        for future in cancelled:
+            future.cancel()
+        # The helper finishes queued renders and exits once its stdin closes
+        self._requests.close()
+        if wait:
+            self._process.wait()
+            self._replies.close()
+
+
+class ReportExporter:
+    """Renders many report PDFs in a process pool and streams them as one zip.
+
+    Reports are loaded and rendered in order with at most ``window`` in
+    flight, and each PDF is written to the archive and handed to the caller
+    as soon as it is ready, so memory stays flat however many reports are
+    exported. PDFs already in ``cache`` are not rendered again. The pool is
+    started on first use, in a helper process (see ``_RenderHelper``), so
+    it never forks a threaded server and its workers never import the app.
+    """
+
+    def __init__(self, workers: int = 4, window: Optional[int] = None):
+        self.workers = workers
+        self.window = window or workers * 2
+        self._pool: Optional[_RenderHelper] = None
+        self._lock = threading.Lock()
+
+        self.exports = 0
+        self.exported = 0
+        self.rendered = 0
+        self.cached = 0
+        self.errors = 0
+
+    def _executor(self) -> _RenderHelper:
+        with self._lock:
+            if self._pool is None:
+                self._pool = _RenderHelper(self.workers)
+            return self._pool
+
+    def _reset(self, pool: _RenderHelper):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, store, ride_ids: Iterable[str],
+               cache: Optional[PDFCache] = None) -> Iterator[Tuple[str, Optional[bytes], Optional[str]]]:
+        """(ride_id, PDF bytes, error) per ride, in order"""
+        pool = self._executor()
+        pending = deque()
+        for ride_id in ride_ids:
+            pending.append(self._start(pool, store, ride_id, cache))
+            while len(pending) >= self.window:
+                yield self._finish(pool, *pending.popleft())
+        while pending:
+            yield self._finish(pool, *pending.popleft())
+
+    def _start(self, pool: _RenderHelper, store, ride_id: str, cache: Optional[PDFCache]) -> Tuple:
+        data = store.get(ride_id)
+        if data is None:
+            return ride_id, None, "report not found"
+        cached = cache.get(data) if cache is not None else None
+        if isinstance(cached, str):
+            # Read now: any process pruning the cache directory may delete
+            # the file before its turn in the archive comes
+            try:
+                with open(cached, 'rb') as f:
+                    cached = f.read()
+            except FileNotFoundError:
+                cached = None
+        if cached is not None:
+            with self._lock:
+                self.cached += 1
+            return ride_id, cached, None
+        try:
+            job = pool.submit(render_report_pdf, data)
+        except BrokenProcessPool as e:
+            self._reset(pool)
+            return ride_id, None, f"render failed: {e!r}"
+        with self._lock:
+            self.rendered += 1
+        return ride_id, job, None
+
+    def _finish(self, pool: _RenderHelper, ride_id: str, job, error: Optional[str]) -> Tuple:
+        if not isinstance(job, Future):
+            return ride_id, job, error
+        try:
+            return ride_id, job.result(), None
+        except Exception as e:
+            if isinstance(e, BrokenProcessPool):
+                # A worker died; the next export starts a fresh pool
+                self._reset(pool)
+            return ride_id, None, f"render failed: {e!r}"
+
+    def export_zip(self, store, ride_ids: List[str], cache: Optional[PDFCache] = None) -> Iterator[bytes]:
+        """Zip archive of ``<ride_id>.pdf`` files plus a manifest.json, as a stream of chunks"""
+        with self._lock:
+            self.exports += 1
+        sink = _ChunkSink()
+        manifest = []
+        # PDFs are already compressed; storing them keeps the export CPU-bound on rendering only
+        with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+            for ride_id, pdf, error in self.render(store, ride_ids, cache):
+                if error is not None:
+                    with self._lock:
+                        self.errors += 1
+                    manifest.append({"ride_id": ride_id, "error": error})
+                    continue
+
+                name = f"{ride_id}.pdf"
+                archive.writestr(name, pdf)
+                with self._lock:
+                    self.exported += 1
+                manifest.append({"ride_id": ride_id, "file": name})
+                yield sink.drain()
+
+            archive.writestr('manifest.json', json.dumps({
+                "exported_at": datetime.now().isoformat(),
+                "reports": manifest,
+            }, indent=2))
+        yield sink.drain()
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "exports": self.exports,
+                "exported": self.exported,
+                "rendered": self.rendered,
+                "cached": self.cached,
+                "errors": self.errors,
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--db', default=os.environ.get('GOGUARD_RIDE_DB'),
+                        help="SQLite file the server stores reports in (GOGUARD_RIDE_DB)")
+    parser.add_argument('--ride-id', dest='ride_ids', nargs='+', default=[])
+    parser.add_argument('--start', help="Rides started at or after (ISO 8601 or epoch seconds)")
+    parser.add_argument('--end', help="Rides started at or before (default: now)")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--pdf-cache-dir', default=os.environ.get('GOGUARD_PDF_CACHE_DIR'),
+                        help="Reuse PDFs the server already rendered")
+    parser.add_argument('-o', '--output', default='ride_reports.zip', help="Zip file, or - for stdout")
+    args = parser.parse_args()
+
+    if not args.db:
+        parser.error("--db (or GOGUARD_RIDE_DB) is required; in-memory reports live only in the server")
+    store = SQLiteReportStore(args.db)
+    try:
+        ride_ids = select_ride_ids(store, args.ride_ids, args.start, args.end)
+    except ValueError as e:
+        parser.error(str(e))
+
+    cache = PDFCache(directory=args.pdf_cache_dir) if args.pdf_cache_dir else None
+    exporter = ReportExporter(workers=args.workers)
+    started = time.perf_counter()
+    out = sys.stdout.buffer if args.output == '-' else open(args.output, 'wb')
+    try:
+        for chunk in exporter.export_zip(store, ride_ids, cache):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+        exporter.shutdown()
+
+    stats = exporter.stats()
+    print(f"Exported {stats['exported']} of {len(ride_ids)} reports ({stats['rendered']} rendered, "
+          f"{stats['cached']} cached, {stats['errors']} errors) in {time.perf_counter() - started:.1f}s",
+          file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
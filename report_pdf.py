@@ -0,0 +1,296 @@
+"""
+Report PDFs for GoGuard
+Safety report PDF rendering, cached by report content in memory and optionally on disk
+"""
+
+import hashlib
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, Optional, Union
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import StyleSheet1, getSampleStyleSheet
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# Bump when the layout below changes, so cached PDFs of old layouts are not served
+PDF_LAYOUT_VERSION = 1
+
+EVENTS_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+])
+
+_styles: Optional[StyleSheet1] = None
+
+
+def report_styles() -> StyleSheet1:
+    """Sample style sheet, built once per process and only read afterwards"""
+    global _styles
+    if _styles is None:
+        _styles = getSampleStyleSheet()
+    return _styles
+
+
+def render_report_pdf(data: Dict) -> bytes:
+    """Render a stored safety report as a PDF document"""
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
+    elements = []
+
+    styles = report_styles()
+    title = Paragraph("Ride Safety Report", styles['Title'])
+    elements.append(title)
+    elements.append(Spacer(1, 12))
+
+    # Overview
+    overview_data = [
+        ["ID", data.get("id", "RIDE_NULL")],
+        ["Safety Score", data.get("safety_score", "")],
+        ["Driver", f'{data["driver"]["name"]} ({data["driver"]["phone"]})'],
+        ["Driver Rating", data["driver"]["rating"]],
+        ["Driver Vehicle", f'{data["driver"]["vehicle_color"]} {data["driver"]["vehicle_model"]} {data["driver"]["vehicle_number"]}'],
+        ["Pickup", f'{data.get("pickup_location", "Unknown")} {data.get("pickup_coords", "")}'],
+        ["Dropoff", f'{data.get("dropoff_location", "Unknown")} {data.get("dropoff_coords", "")}'],
+        ["Route Type", data.get("route_type", "")],
+        ["Duration", data.get("duration", "")],
+        # ["Incidents", data.get("incidents", "")],
+        ["Transcripts", data.get("transcripts", [])],
+        ["Recommendations", ', '.join(data.get("recommendations", []))],
+        ["Summary", data.get("qwen_response", "")],
+    ]
+    for key, value in overview_data:
+        elements.append(Paragraph(f"<b>{key}:</b> {value}", styles['Normal']))
+    elements.append(Spacer(1, 12))
+
+    # Safety Events
+    events = data.get("safety_events", [])
+    if events:
+        event_keys = list(events[0].keys())
+        table_data = [event_keys]  # headers
+        for event in events:
+            table_data.append([str(event.get(k, "")) for k in event_keys])
+
+        table = Table(table_data, repeatRows=1)
+        table.setStyle(EVENTS_TABLE_STYLE)
+        elements.append(Paragraph("Safety Events", styles['Heading2']))
+        elements.append(table)
+
+    doc.build(elements)
+    return buffer.getvalue()
+
+
+def report_digest(data: Dict) -> str:
+    """Content address of a report's PDF: same report content, same PDF"""
+    canonical = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(f"v{PDF_LAYOUT_VERSION}:{canonical}".encode()).hexdigest()
+
+
+class PDFCache:
+    """Rendered report PDFs keyed by ``report_digest``.
+
+    PDFs are kept in memory (LRU, bounded by total bytes) or, with a
+    ``directory``, written there as ``<digest>.pdf`` and served from the
+    file so the server can send it without copying it through Python.
+    Files are content-addressed and written atomically, so worker processes
+    can share one directory. Concurrent requests for the same report share
+    one render.
+
+    The directory is bounded by ``max_bytes`` too: hits refresh a file's
+    mtime, and once this cache has written enough to go over the limit it
+    rescans the directory and deletes the least recently used files down to
+    ``prune_to`` of the limit. A cache that only reads never deletes.
+    """
+
+    # Leftover temp files of writers that died are removed after this long
+    TEMP_MAX_AGE = 60 * 60
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, directory: Optional[str] = None,
+                 prune_to: float = 0.8):
+        self.max_bytes = max_bytes
+        self.prune_to = prune_to
+        self.directory = os.path.abspath(directory) if directory else None
+        if directory:
+            os.makedirs(self.directory, exist_ok=True)
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self._bytes = 0
+        # Directory size as of the last prune plus what this cache wrote since;
+        # None until the first write scans the directory
+        self._disk_bytes: Optional[int] = None
+        self._pruning = False
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.renders = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.prunes = 0
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, f"{digest}.pdf")
+
+    def _lookup(self, digest: str) -> Union[str, bytes, None]:
+        if self.directory:
+            # File system calls stay outside the lock
+            path = self._path(digest)
+            try:
+                # Marks the file recently used for pruning
+                os.utime(path)
+            except FileNotFoundError:
+                return None
+            with self._lock:
+                self.disk_hits += 1
+            return path
+
+        with self._lock:
+            pdf = self._data.get(digest)
+            if pdf is not None:
+                self._data.move_to_end(digest)
+                self.hits += 1
+            return pdf
+
+    def _store(self, digest: str, pdf: bytes) -> Union[str, bytes]:
+        if self.directory:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(pdf)
+                os.replace(tmp_path, self._path(digest))
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.unlink(tmp_path)
+                raise
+            with self._lock:
+                if self._disk_bytes is not None:
+                    self._disk_bytes += len(pdf)
+                prune = not self._pruning and (self._disk_bytes is None or self._disk_bytes > self.max_bytes)
+                if prune:
+                    self._pruning = True
+            if prune:
+                try:
+                    self._prune_directory(keep=digest)
+                finally:
+                    with self._lock:
+                        self._pruning = False
+            return self._path(digest)
+
+        with self._lock:
+            if len(pdf) <= self.max_bytes and digest not in self._data:
+                self._data[digest] = pdf
+                self._bytes += len(pdf)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._data.popitem(last=False)
+                    self._bytes -= len(evicted)
+                    self.evictions += 1
+        return pdf
+
+    def _prune_directory(self, keep: str):
+        """Delete least recently used PDFs until the directory fits ``prune_to`` of max_bytes"""
+        files = []
+        total = 0
+        now = time.time()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                if entry.name.endswith('.tmp'):
+                    if now - stat.st_mtime > self.TEMP_MAX_AGE:
+                        self._unlink(entry.path)
+                    continue
+                if entry.name.endswith('.pdf'):
+                    files.append((stat.st_mtime, stat.st_size, entry.name, entry.path))
+                    total += stat.st_size
+
+        removed = 0
+        if total > self.max_bytes:
+            target = self.max_bytes * self.prune_to
+            for _, size, name, path in sorted(files):
+                if total <= target:
+                    break
+                if name == f"{keep}.pdf":
+                    continue
+                # Another process may have pruned it already
+                if self._unlink(path):
+                    removed += 1
+                total -= size
+
+        with self._lock:
+            self._disk_bytes = total
+            self.evictions += removed
+            self.prunes += 1
+
+    @staticmethod
+    def _unlink(path: str) -> bool:
+        try:
+            os.unlink(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def get(self, data: Dict) -> Union[str, bytes, None]:
+        """The report's cached PDF (path or bytes), without rendering it"""
+        return self._lookup(report_digest(data))
+
+    def get_or_render(self, data: Dict) -> Union[str, bytes]:
+        """The report's PDF: a file path when cached on disk, else the bytes"""
+        digest = report_digest(data)
+        cached = self._lookup(digest)
+        if cached is not None:
+            return cached
+        with self._lock:
+            future = self._inflight.get(digest)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._inflight[digest] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            # Another leader may have finished between the lookup and taking the lock
+            pdf = self._lookup(digest)
+            rendered = pdf is None
+            if rendered:
+                pdf = self._store(digest, render_report_pdf(data))
+        except BaseException as e:
+            with self._lock:
+                del self._inflight[digest]
+            future.set_exception(e)
+            raise
+
+        with self._lock:
+            self.renders += rendered
+            del self._inflight[digest]
+        future.set_result(pdf)
+        return pdf
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "directory": self.directory,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "renders": self.renders,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "disk_bytes": self._disk_bytes,
+                "prunes": self.prunes,
+            }
@@ -0,0 +1,492 @@
+"""
+Ride Registry for GoGuard
+Active ride and report storage: sharded in-memory, or SQLite shared by worker processes
+
+Both ride registries expose the same interface (put, get, __contains__,
+__len__, ids, version, read, update, append_event, pop, stats), as do both
+report stores, so goguard can switch between them with configuration only.
+
+A ride's safety_events is an append-only log: events are never rewritten or
+removed while the ride is active, so an event's seq (its 1-based position)
+is a stable cursor for readers that only want what came after it.
+
+Rides and reports carry a version that grows with every change, so callers
+can validate cached responses without loading or rendering anything.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_MISSING = object()
+
+
+class _Entry:
+    __slots__ = ('ride', 'lock', 'closed', 'version')
+
+    def __init__(self, ride):
+        self.ride = ride
+        self.lock = threading.Lock()
+        self.closed = False
+        self.version = 1
+
+
+class RideRegistry:
+    """Concurrent map of ride id -> ride.
+
+    Rides are spread over ``shards`` dicts, each with its own lock that is
+    held only for the dict operation itself. Every ride also has its own
+    lock: ``update`` and ``append_event`` run under it, and ``pop`` takes it
+    before returning, so a ride is never removed halfway through a mutation
+    and nothing mutates it after it has been popped.
+    """
+
+    def __init__(self, shards: int = 64):
+        self._shards: List[Dict[str, _Entry]] = [{} for _ in range(shards)]
+        self._locks = [threading.Lock() for _ in range(shards)]
+
+    def _index(self, ride_id: str) -> int:
+        return hash(ride_id) % len(self._shards)
+
+    def _entry(self, ride_id: str) -> Optional[_Entry]:
+        index = self._index(ride_id)
+        with self._locks[index]:
+            return self._shards[index].get(ride_id)
+
+    def put(self, ride_id: str, ride: Any):
+        index = self._index(ride_id)
+        with self._locks[index]:
+            self._shards[index][ride_id] = _Entry(ride)
+
+    def get(self, ride_id: str, default: Any = None) -> Any:
+        """The ride object; read mutable fields through ``update`` instead"""
+        entry = self._entry(ride_id)
+        return default if entry is None else entry.ride
+
+    def __contains__(self, ride_id: str) -> bool:
+        return self._entry(ride_id) is not None
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+    def ids(self) -> List[str]:
+        ride_ids = []
+        for lock, shard in zip(self._locks, self._shards):
+            with lock:
+                ride_ids.extend(shard)
+        return ride_ids
+
+    def version(self, ride_id: str) -> Optional[int]:
+        """Counter bumped by every update of the ride; None if it isn't active"""
+        entry = self._entry(ride_id)
+        return None if entry is None or entry.closed else entry.version
+
+    def _run(self, ride_id: str, fn: Callable[[Any], Any], default: Any, write: bool) -> Any:
+        entry = self._entry(ride_id)
+        if entry is not None:
+            with entry.lock:
+                if not entry.closed:
+                    result = fn(entry.ride)
+                    if write:
+                        entry.version += 1
+                    return result
+        if default is _MISSING:
+            raise KeyError(ride_id)
+        return default
+
+    def update(self, ride_id: str, fn: Callable[[Any], Any], default: Any = _MISSING) -> Any:
+        """Run ``fn(ride)`` under the ride's lock and return its result.
+
+        For a missing (or already popped) ride, returns ``default`` when
+        given and raises KeyError otherwise.
+        """
+        return self._run(ride_id, fn, default, write=True)
+
+    def read(self, ride_id: str, fn: Callable[[Any], Any], default: Any = _MISSING) -> Any:
+        """Like ``update``, for ``fn`` that only reads (e.g. a consistent snapshot)"""
+        return self._run(ride_id, fn, default, write=False)
+
+    def append_event(self, ride_id: str, event: Dict) -> int:
+        """Append to the ride's safety_events; returns the event's seq, or 0 if the ride is gone"""
+        def append(ride):
+            ride.safety_events.append(event)
+            return len(ride.safety_events)
+
+        return self.update(ride_id, append, default=0)
+
+    def pop(self, ride_id: str, default: Any = None) -> Any:
+        """Remove a ride once no update is running on it; only one caller gets it"""
+        index = self._index(ride_id)
+        with self._locks[index]:
+            entry = self._shards[index].pop(ride_id, None)
+        if entry is None:
+            return default
+        with entry.lock:
+            entry.closed = True
+        return entry.ride
+
+    def stats(self) -> Dict:
+        sizes = [len(shard) for shard in self._shards]
+        return {
+            "rides": sum(sizes),
+            "backend": "memory",
+            "shards": len(sizes),
+            "largest_shard": max(sizes),
+        }
+
+
+class _SQLiteStore:
+    """Per-thread WAL connections to one database file, reopened after a fork"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            # Autocommit mode; transactions are opened explicitly
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def _add_column(self, table: str, column: str, definition: str):
+        """Bring a table created by an older version up to date"""
+        conn = self._connection()
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+        if column not in columns:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+
+
+class SQLiteRideRegistry(_SQLiteStore):
+    """RideRegistry stored in SQLite, so every worker process sees the same rides.
+
+    Ride fields live in one JSON row per ride; safety events are an
+    append-only table, so ``append_event`` is a single INSERT and never
+    rewrites the ride. A ride's version is its row version (bumped by every
+    write of the row) plus its event count, both of which only grow.
+    ``update`` runs ``fn`` inside a ``BEGIN IMMEDIATE``
+    transaction, which serializes writers across processes the way the
+    per-ride lock does within one. Events appended by ``fn`` are stored;
+    existing events are never rewritten.
+
+    ``encode`` turns a ride into a JSON-serializable dict (without
+    ``safety_events``) and ``decode`` rebuilds it from that dict plus its
+    events.
+    """
+
+    def __init__(self, path: str, encode: Callable[[Any], Dict], decode: Callable[[Dict, List[Dict]], Any]):
+        super().__init__(path)
+        self.encode = encode
+        self.decode = decode
+
+        conn = self._connection()
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS rides ("
+            " ride_id TEXT PRIMARY KEY,"
+            " data TEXT NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS ride_events ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " ride_id TEXT NOT NULL,"
+            " event TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ride_events_ride ON ride_events (ride_id, seq)")
+        self._add_column('rides', 'version', "INTEGER NOT NULL DEFAULT 1")
+
+    def _load(self, conn: sqlite3.Connection, ride_id: str) -> Any:
+        row = conn.execute("SELECT data FROM rides WHERE ride_id = ?", (ride_id,)).fetchone()
+        if row is None:
+            return None
+        events = [json.loads(event) for (event,) in conn.execute(
+            "SELECT event FROM ride_events WHERE ride_id = ? ORDER BY seq", (ride_id,)
+        )]
+        return self.decode(json.loads(row[0]), events)
+
+    def _write(self, conn: sqlite3.Connection, ride_id: str, ride: Any):
+        conn.execute(
+            "INSERT INTO rides (ride_id, data, updated_at, version) VALUES (?, ?, ?, 1)"
+            " ON CONFLICT (ride_id) DO UPDATE SET"
+            " data = excluded.data, updated_at = excluded.updated_at, version = rides.version + 1",
+            (ride_id, json.dumps(self.encode(ride), default=str), time.time())
+        )
+
+    def _append(self, conn: sqlite3.Connection, ride_id: str, events: List[Dict]):
+        conn.executemany(
+            "INSERT INTO ride_events (ride_id, event) VALUES (?, ?)",
+            [(ride_id, json.dumps(event, default=str)) for event in events]
+        )
+
+    def put(self, ride_id: str, ride: Any):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            self._write(conn, ride_id, ride)
+            conn.execute("DELETE FROM ride_events WHERE ride_id = ?", (ride_id,))
+            self._append(conn, ride_id, ride.safety_events or [])
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def get(self, ride_id: str, default: Any = None) -> Any:
+        """A decoded copy of the ride; change it through ``update``"""
+        conn = self._connection()
+        # One read transaction, so the ride row and its events match
+        conn.execute("BEGIN")
+        try:
+            ride = self._load(conn, ride_id)
+        finally:
+            conn.execute("COMMIT")
+        return default if ride is None else ride
+
+    def __contains__(self, ride_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM rides WHERE ride_id = ?", (ride_id,)
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM rides").fetchone()[0]
+
+    def ids(self) -> List[str]:
+        return [ride_id for (ride_id,) in self._connection().execute("SELECT ride_id FROM rides")]
+
+    def version(self, ride_id: str) -> Optional[int]:
+        row = self._connection().execute(
+            "SELECT version + (SELECT COUNT(*) FROM ride_events WHERE ride_id = ?) FROM rides WHERE ride_id = ?",
+            (ride_id, ride_id)
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def read(self, ride_id: str, fn: Callable[[Any], Any], default: Any = _MISSING) -> Any:
+        """``fn`` sees a consistent snapshot without taking the write lock"""
+        ride = self.get(ride_id, _MISSING)
+        if ride is _MISSING:
+            if default is _MISSING:
+                raise KeyError(ride_id)
+            return default
+        return fn(ride)
+
+    def update(self, ride_id: str, fn: Callable[[Any], Any], default: Any = _MISSING) -> Any:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ride = self._load(conn, ride_id)
+            if ride is None:
+                conn.execute("COMMIT")
+                if default is _MISSING:
+                    raise KeyError(ride_id)
+                return default
+
+            known_events = len(ride.safety_events)
+            result = fn(ride)
+            self._write(conn, ride_id, ride)
+            self._append(conn, ride_id, ride.safety_events[known_events:])
+            conn.execute("COMMIT")
+            return result
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+
+    def append_event(self, ride_id: str, event: Dict) -> int:
+        conn = self._connection()
+        cursor = conn.execute(
+            "INSERT INTO ride_events (ride_id, event)"
+            " SELECT ?, ? WHERE EXISTS (SELECT 1 FROM rides WHERE ride_id = ?)",
+            (ride_id, json.dumps(event, default=str), ride_id)
+        )
+        if cursor.rowcount != 1:
+            return 0
+        # Later appends get larger row seqs, so the ride's position count is stable
+        return conn.execute(
+            "SELECT COUNT(*) FROM ride_events WHERE ride_id = ? AND seq <= ?", (ride_id, cursor.lastrowid)
+        ).fetchone()[0]
+
+    def pop(self, ride_id: str, default: Any = None) -> Any:
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            ride = self._load(conn, ride_id)
+            if ride is not None:
+                conn.execute("DELETE FROM rides WHERE ride_id = ?", (ride_id,))
+                conn.execute("DELETE FROM ride_events WHERE ride_id = ?", (ride_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return default if ride is None else ride
+
+    def stats(self) -> Dict:
+        return {
+            "rides": len(self),
+            "backend": self.path,
+        }
+
+
+class ReportStore:
+    """Dict-like ride id -> safety report store, versioned per report.
+
+    Also keeps a marker per report still being generated (see
+    ``mark_pending``); storing the report clears it.
+    """
+
+    def __init__(self):
+        self._reports: Dict[str, Dict] = {}
+        self._versions: Dict[str, Tuple[int, float]] = {}
+        self._pending: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+
+    def __setitem__(self, ride_id: str, report: Dict):
+        with self._lock:
+            version, _ = self._versions.get(ride_id, (0, 0.0))
+            self._reports[ride_id] = report
+            self._versions[ride_id] = (version + 1, time.time())
+            self._pending.pop(ride_id, None)
+
+    def mark_pending(self, ride_id: str, status: str = 'PENDING', error: Optional[str] = None,
+                     replace: bool = True) -> bool:
+        """Record that a report is being generated (or that generating it failed).
+
+        With ``replace=False`` an existing marker is left alone. Returns
+        whether the marker was written.
+        """
+        with self._lock:
+            if not replace and ride_id in self._pending:
+                return False
+            self._pending[ride_id] = {"status": status, "error": error, "updated_at": time.time()}
+            return True
+
+    def clear_pending(self, ride_id: str):
+        with self._lock:
+            self._pending.pop(ride_id, None)
+
+    def pending(self, ride_id: str) -> Optional[Dict]:
+        """{"status", "error", "updated_at"} of a report not stored yet, None if unmarked"""
+        return self._pending.get(ride_id)
+
+    def get(self, ride_id: str, default: Any = None) -> Any:
+        return self._reports.get(ride_id, default)
+
+    def __getitem__(self, ride_id: str) -> Dict:
+        return self._reports[ride_id]
+
+    def __contains__(self, ride_id: str) -> bool:
+        return ride_id in self._reports
+
+    def __len__(self) -> int:
+        return len(self._reports)
+
+    def version(self, ride_id: str) -> Optional[Tuple[int, float]]:
+        """(version, time it was stored) of a report, None if there is none"""
+        return self._versions.get(ride_id)
+
+    def ids(self, low: Optional[str] = None, high: Optional[str] = None) -> List[str]:
+        """Ride ids with a report, sorted, optionally within [low, high].
+
+        Generated ids sort by creation time, so ``ids.id_range`` bounds
+        select the reports of rides started in a time range.
+        """
+        with self._lock:
+            ride_ids = list(self._reports)
+        return sorted(ride_id for ride_id in ride_ids
+                      if (low is None or ride_id >= low) and (high is None or ride_id <= high))
+
+
+class SQLiteReportStore(_SQLiteStore):
+    """ReportStore shared by worker processes"""
+
+    def __init__(self, path: str):
+        super().__init__(path)
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS ride_reports ("
+            " ride_id TEXT PRIMARY KEY,"
+            " report TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        self._add_column('ride_reports', 'version', "INTEGER NOT NULL DEFAULT 1")
+        # Reports being generated, visible to every worker process
+        self._connection().execute(
+            "CREATE TABLE IF NOT EXISTS pending_reports ("
+            " ride_id TEXT PRIMARY KEY,"
+            " status TEXT NOT NULL,"
+            " error TEXT,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def __setitem__(self, ride_id: str, report: Dict):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute(
+                "INSERT INTO ride_reports (ride_id, report, created_at, version) VALUES (?, ?, ?, 1)"
+                " ON CONFLICT (ride_id) DO UPDATE SET"
+                " report = excluded.report, created_at = excluded.created_at, version = ride_reports.version + 1",
+                (ride_id, json.dumps(report, default=str), time.time())
+            )
+            conn.execute("DELETE FROM pending_reports WHERE ride_id = ?", (ride_id,))
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def mark_pending(self, ride_id: str, status: str = 'PENDING', error: Optional[str] = None,
+                     replace: bool = True) -> bool:
+        conflict = ("DO UPDATE SET status = excluded.status, error = excluded.error, updated_at = excluded.updated_at"
+                    if replace else "DO NOTHING")
+        cursor = self._connection().execute(
+            "INSERT INTO pending_reports (ride_id, status, error, updated_at) VALUES (?, ?, ?, ?)"
+            f" ON CONFLICT (ride_id) {conflict}",
+            (ride_id, status, error, time.time())
+        )
+        return cursor.rowcount == 1
+
+    def clear_pending(self, ride_id: str):
+        self._connection().execute("DELETE FROM pending_reports WHERE ride_id = ?", (ride_id,))
+
+    def pending(self, ride_id: str) -> Optional[Dict]:
+        row = self._connection().execute(
+            "SELECT status, error, updated_at FROM pending_reports WHERE ride_id = ?", (ride_id,)
+        ).fetchone()
+        return None if row is None else {"status": row[0], "error": row[1], "updated_at": row[2]}
+
+    def get(self, ride_id: str, default: Any = None) -> Any:
+        row = self._connection().execute(
+            "SELECT report FROM ride_reports WHERE ride_id = ?", (ride_id,)
+        ).fetchone()
+        return default if row is None else json.loads(row[0])
+
+    def __getitem__(self, ride_id: str) -> Dict:
+        report = self.get(ride_id, _MISSING)
+        if report is _MISSING:
+            raise KeyError(ride_id)
+        return report
+
+    def __contains__(self, ride_id: str) -> bool:
+        return self._connection().execute(
+            "SELECT 1 FROM ride_reports WHERE ride_id = ?", (ride_id,)
+        ).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM ride_reports").fetchone()[0]
+
+    def version(self, ride_id: str) -> Optional[Tuple[int, float]]:
+        row = self._connection().execute(
+            "SELECT version, created_at FROM ride_reports WHERE ride_id = ?", (ride_id,)
+        ).fetchone()
+        return None if row is None else (row[0], row[1])
+
+    def ids(self, low: Optional[str] = None, high: Optional[str] = None) -> List[str]:
+        # A range scan of the primary key index, which is in creation order
+        return [ride_id for (ride_id,) in self._connection().execute(
+            "SELECT ride_id FROM ride_reports WHERE ride_id >= ? AND ride_id <= ? ORDER BY ride_id",
+            ('' if low is None else low, '\uffff' if high is None else high)
+        )]
@@ -0,0 +1,186 @@
+"""
+Scheduling for GoGuard
+Hashed timer wheel driving periodic ride checks from a single thread
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Callable, Dict, List, Optional, Set
+
+
+class TimerHandle:
+    """A scheduled (one-shot or periodic) callback; ``cancel()`` is O(1)"""
+
+    __slots__ = ('due', 'interval', 'callback', 'args', 'tick', 'cancelled', '_wheel')
+
+    def __init__(self, wheel: 'TimerWheel', due: float, interval: Optional[float], callback: Callable, args: tuple):
+        self._wheel = wheel
+        self.due = due
+        self.interval = interval
+        self.callback = callback
+        self.args = args
+        self.tick = 0
+        self.cancelled = False
+
+    def cancel(self):
+        self._wheel.cancel(self)
+
+
+class TimerWheel:
+    """Hashed timer wheel: ``slots`` buckets of ``tick`` seconds each.
+
+    Inserting and cancelling a timer touches one bucket (O(1)); a timer
+    further away than one revolution simply waits in its bucket until its
+    absolute tick comes round. One thread advances the wheel and catches up
+    on ticks it overslept, so thousands of periodic timers cost one thread.
+
+    Periodic timers run at a fixed rate from their first due time, so they
+    don't accumulate drift. Callback lateness (scheduling jitter) and the
+    wheel's own lag behind the clock are reported by ``stats()``.
+    """
+
+    def __init__(self, tick: float = 0.1, slots: int = 1024, executor: Optional[Executor] = None,
+                 clock: Callable[[], float] = time.monotonic, name: str = 'timer-wheel'):
+        self.tick_seconds = tick
+        self.executor = executor
+        self.name = name
+        self._clock = clock
+        self._slots: List[Set[TimerHandle]] = [set() for _ in range(slots)]
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._start = clock()
+        self._current_tick = 0
+
+        self.scheduled = 0
+        self.fired = 0
+        self.cancelled = 0
+        self.skipped = 0
+        self.errors = 0
+        self.pending = 0
+        self._lateness = deque(maxlen=2048)
+        self.tick_lag = 0.0
+        self.max_tick_lag = 0.0
+
+    def call_later(self, delay: float, callback: Callable, *args) -> TimerHandle:
+        """Run ``callback(*args)`` once after ``delay`` seconds"""
+        handle = TimerHandle(self, self._clock() + delay, None, callback, args)
+        self._insert(handle, new=True)
+        return handle
+
+    def call_every(self, interval: float, callback: Callable, *args, first_delay: Optional[float] = None) -> TimerHandle:
+        """Run ``callback(*args)`` every ``interval`` seconds until cancelled"""
+        delay = interval if first_delay is None else first_delay
+        handle = TimerHandle(self, self._clock() + delay, interval, callback, args)
+        self._insert(handle, new=True)
+        return handle
+
+    def cancel(self, handle: TimerHandle):
+        with self._lock:
+            if handle.cancelled:
+                return
+            handle.cancelled = True
+            bucket = self._slots[handle.tick % len(self._slots)]
+            if handle in bucket:
+                bucket.discard(handle)
+                self.pending -= 1
+            self.cancelled += 1
+
+    def _insert(self, handle: TimerHandle, new: bool = False):
+        with self._lock:
+            if handle.cancelled:
+                return
+            # First tick boundary at or after the due time, never in the past
+            tick = math.ceil((handle.due - self._start) / self.tick_seconds)
+            handle.tick = max(tick, self._current_tick + 1)
+            self._slots[handle.tick % len(self._slots)].add(handle)
+            self.pending += 1
+            if new:
+                self.scheduled += 1
+            if self._thread is None:
+                # Started on first use so forked workers each get their own
+                self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            next_tick_at = self._start + (self._current_tick + 1) * self.tick_seconds
+            delay = next_tick_at - self._clock()
+            if delay > 0 and self._stop.wait(delay):
+                return
+
+            now = self._clock()
+            target = int((now - self._start) / self.tick_seconds)
+            while self._current_tick < target:
+                with self._lock:
+                    self._current_tick += 1
+                    bucket = self._slots[self._current_tick % len(self._slots)]
+                    due = [handle for handle in bucket if handle.tick <= self._current_tick]
+                    for handle in due:
+                        bucket.discard(handle)
+                    self.pending -= len(due)
+                for handle in due:
+                    self._fire(handle)
+
+            self.tick_lag = self._clock() - (self._start + self._current_tick * self.tick_seconds)
+            self.max_tick_lag = max(self.max_tick_lag, self.tick_lag)
+
+    def _fire(self, handle: TimerHandle):
+        now = self._clock()
+        self._lateness.append(now - handle.due)
+        self.fired += 1
+
+        if handle.interval is not None:
+            # Fixed rate: the next run is due one interval after this one was,
+            # skipping runs the wheel was too late for
+            handle.due += handle.interval
+            if handle.due <= now:
+                missed = math.floor((now - handle.due) / handle.interval) + 1
+                handle.due += missed * handle.interval
+                self.skipped += missed
+            self._insert(handle)
+
+        if self.executor is not None:
+            self.executor.submit(self._call, handle)
+        else:
+            self._call(handle)
+
+    def _call(self, handle: TimerHandle):
+        try:
+            handle.callback(*handle.args)
+        except Exception as e:
+            self.errors += 1
+            print(f"Scheduled callback {getattr(handle.callback, '__name__', handle.callback)} failed: {e!r}")
+
+    def stats(self) -> Dict:
+        lateness = sorted(self._lateness)
+
+        def percentile(p: float) -> float:
+            if not lateness:
+                return 0.0
+            return round(lateness[min(len(lateness) - 1, int(p * len(lateness)))] * 1000, 2)
+
+        return {
+            "pending": self.pending,
+            "scheduled": self.scheduled,
+            "fired": self.fired,
+            "cancelled": self.cancelled,
+            "skipped": self.skipped,
+            "errors": self.errors,
+            "tick_ms": round(self.tick_seconds * 1000, 2),
+            "slots": len(self._slots),
+            "lateness_ms": {
+                "avg": round(sum(lateness) / len(lateness) * 1000, 2) if lateness else 0.0,
+                "p50": percentile(0.5),
+                "p99": percentile(0.99),
+                "max": round(lateness[-1] * 1000, 2) if lateness else 0.0,
+            },
+            "tick_drift_ms": round(self.tick_lag * 1000, 2),
+            "max_tick_drift_ms": round(self.max_tick_lag * 1000, 2),
+        }